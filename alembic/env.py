@@ -8,7 +8,9 @@ from alembic import context
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url", "sqlite:///./user_management.db")
+
+from user.config import DATABASE_URL
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -17,7 +19,7 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 # for 'autogenerate' support
-from user.db import Base
+from user.db import Base, configure_sqlite_engine
 from user.models import User  # Import your models here
 target_metadata = Base.metadata
 
@@ -63,6 +65,7 @@ def run_migrations_online() -> None:
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
+    configure_sqlite_engine(connectable)
 
     with connectable.connect() as connection:
         context.configure(
@@ -0,0 +1,34 @@
+"""add indexes for status, refresh token and audit log lookups
+
+Revision ID: 0f7b9cb4bdaa
+Revises: 7a3dd78a3fe5
+Create Date: 2026-10-17 03:07:45.132208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0f7b9cb4bdaa'
+down_revision: Union[str, None] = '7a3dd78a3fe5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_status_id', 'users', ['status', 'id'], unique=False)
+    op.create_index('ix_refresh_tokens_user_id_revoked', 'refresh_tokens', ['user_id', 'revoked'], unique=False)
+    op.create_index('ix_action_logs_user_id_timestamp', 'action_logs', ['user_id', 'timestamp'], unique=False)
+    op.create_index('ix_action_logs_timestamp', 'action_logs', ['timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_action_logs_timestamp', table_name='action_logs')
+    op.drop_index('ix_action_logs_user_id_timestamp', table_name='action_logs')
+    op.drop_index('ix_refresh_tokens_user_id_revoked', table_name='refresh_tokens')
+    op.drop_index('ix_users_status_id', table_name='users')
@@ -0,0 +1,55 @@
+"""use timestamptz columns on postgresql
+
+Revision ID: 7a3dd78a3fe5
+Revises: c169f2ac42de
+Create Date: 2026-10-17 03:04:42.864629
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3dd78a3fe5'
+down_revision: Union[str, None] = 'c169f2ac42de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TIMESTAMP_COLUMNS = [
+    ('users', 'created_at', False),
+    ('users', 'updated_at', True),
+    ('credentials', 'created_at', False),
+    ('credentials', 'updated_at', True),
+    ('action_logs', 'timestamp', True),
+    ('refresh_tokens', 'created_at', False),
+    ('refresh_tokens', 'expires_at', False),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # c169f2ac42de was a no-op: SQLite stores DateTime as text either way, but PostgreSQL
+    # created these columns as "timestamp without time zone". Existing values are UTC.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column, nullable in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column,
+                        type_=sa.DateTime(timezone=True),
+                        existing_type=sa.DateTime(),
+                        existing_nullable=nullable,
+                        postgresql_using=f"{column} AT TIME ZONE 'UTC'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column, nullable in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column,
+                        type_=sa.DateTime(),
+                        existing_type=sa.DateTime(timezone=True),
+                        existing_nullable=nullable,
+                        postgresql_using=f"{column} AT TIME ZONE 'UTC'")
@@ -0,0 +1,58 @@
+"""store refresh tokens by sha256 digest
+
+Revision ID: 91397a02e8d5
+Revises: 0f7b9cb4bdaa
+Create Date: 2026-10-17 03:09:23.708171
+
+"""
+from typing import Sequence, Union
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '91397a02e8d5'
+down_revision: Union[str, None] = '0f7b9cb4bdaa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+refresh_tokens = sa.table(
+    'refresh_tokens',
+    sa.column('id', sa.Integer()),
+    sa.column('token', sa.String()),
+    sa.column('token_hash', sa.String()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(refresh_tokens.c.id, refresh_tokens.c.token)).all()
+    if rows:
+        conn.execute(
+            refresh_tokens.update().where(refresh_tokens.c.id == sa.bindparam('row_id')).values(token_hash=sa.bindparam('digest')),
+            [{'row_id': row.id, 'digest': hashlib.sha256(row.token.encode()).hexdigest()} for row in rows]
+        )
+
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('token_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_unique_constraint('uq_refresh_tokens_token_hash', ['token_hash'])
+        batch_op.drop_column('token')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The original tokens cannot be recovered from their digests. Rows keep the digest in the
+    # token column, so they stay unique but no longer match any issued token.
+    op.add_column('refresh_tokens', sa.Column('token', sa.String(length=255), nullable=True))
+    op.execute(refresh_tokens.update().values(token=refresh_tokens.c.token_hash))
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('token', existing_type=sa.String(length=255), nullable=False)
+        batch_op.create_unique_constraint('uq_refresh_tokens_token', ['token'])
+        batch_op.drop_constraint('uq_refresh_tokens_token_hash', type_='unique')
+        batch_op.drop_column('token_hash')
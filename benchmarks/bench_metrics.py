@@ -0,0 +1,74 @@
+"""
+Overhead of the request metrics middleware and database query instrumentation.
+
+    python -m benchmarks.bench_metrics [--requests 5000] [--repeat 5]
+
+Two identical apps serve a route that runs one SQLite query through ASGITransport, one bare and one with
+MetricsMiddleware plus instrument_engine. The difference in time per request is the cost of keeping metrics enabled.
+The apps take turns for --repeat rounds. The overhead of each round is reported as median and min-max, because
+single runs are noisy.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from user.metrics import Histogram, MetricsMiddleware, instrument_engine
+
+def build_app(instrumented: bool) -> FastAPI:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    app = FastAPI()
+
+    @app.get("/users/{user_id}")
+    async def get_user(user_id: int):
+        with engine.connect() as conn:
+            return {"id": conn.execute(text("SELECT :id"), {"id": user_id}).scalar_one()}
+
+    if instrumented:
+        instrument_engine(engine)
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+async def run(app: FastAPI, requests: int) -> float:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for i in range(100):
+            await client.get(f"/users/{i}")
+        start = time.perf_counter()
+        for i in range(requests):
+            await client.get(f"/users/{i}")
+        return (time.perf_counter() - start) / requests * 1e6
+
+def observe_cost(samples: int = 200000) -> float:
+    histogram = Histogram("bench_seconds", "Benchmark.", ("route",))
+    start = time.perf_counter()
+    for i in range(samples):
+        histogram.observe(("/users/{user_id}",), 0.004)
+    return (time.perf_counter() - start) / samples * 1e9
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    apps = {"bare": build_app(False), "metrics": build_app(True)}
+    results = {name: [] for name in apps}
+    # Alternate between the apps so warm-up and machine noise affect both equally
+    for _ in range(args.repeat):
+        for name, app in apps.items():
+            results[name].append(asyncio.run(run(app, args.requests)))
+
+    print(f"{'app':>8} {'median us':>10} {'min':>8} {'max':>8}")
+    for name, runs in results.items():
+        print(f"{name:>8} {statistics.median(runs):>10.1f} {min(runs):>8.1f} {max(runs):>8.1f}")
+    overheads = [metrics - bare for bare, metrics in zip(results["bare"], results["metrics"])]
+    percentages = [overhead / bare * 100 for overhead, bare in zip(overheads, results["bare"])]
+    print(f"overhead: median {statistics.median(overheads):.1f} us/request ({statistics.median(percentages):.1f}%), "
+          f"range {min(overheads):.1f} to {max(overheads):.1f} us ({min(percentages):.1f}% to {max(percentages):.1f}%)")
+    print(f"Histogram.observe: {observe_cost():.0f} ns")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Time and memory of loading 1000 users as full ORM entities versus the UserOut column projection.
+
+    python -m benchmarks.bench_projection [--rows 1000] [--repeat 20]
+
+Memory is measured with tracemalloc. "peak" is the highest allocation while loading and converting a page.
+"retained" is what is still allocated while the loaded page is held, including the session's identity map.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from user.db import Base
+from user.models import User
+from user.projections import select_user_out, user_out_dict
+from user.schemas import UserOut
+
+def seed(session, count: int) -> None:
+    now = datetime.now(timezone.utc)
+    session.add_all([
+        User(email=f"user{i}@example.com", mobile="09123456789", firstName="Bench", middleName="Mark",
+             lastName=f"User{i}", completeName=f"Bench Mark User{i}", role="User", status="active", created_at=now)
+        for i in range(count)
+    ])
+    session.commit()
+
+def load_entities(session, rows: int) -> list[dict]:
+    users = session.execute(select(User).order_by(User.id).limit(rows)).scalars().all()
+    return [{field: getattr(user, field) for field in UserOut.model_fields} for user in users]
+
+def load_projection(session, rows: int) -> list[dict]:
+    return [user_out_dict(row) for row in session.execute(select_user_out().order_by(User.id).limit(rows)).all()]
+
+def measure(factory, loader, rows: int, repeat: int) -> tuple[float, int, int]:
+    elapsed = 0.0
+    for _ in range(repeat):
+        session = factory()
+        start = time.perf_counter()
+        loader(session, rows)
+        elapsed += time.perf_counter() - start
+        session.close()
+
+    session = factory()
+    gc.collect()
+    tracemalloc.start()
+    page = loader(session, rows)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del page
+    session.close()
+    return elapsed / repeat * 1000, peak, retained
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        seed(session, args.rows)
+
+    print(f"{'loader':>11} {'ms/page':>8} {'peak KiB':>9} {'retained KiB':>13}")
+    for name, loader in (("entities", load_entities), ("projection", load_projection)):
+        ms, peak, retained = measure(factory, loader, args.rows, args.repeat)
+        print(f"{name:>11} {ms:>8.2f} {peak / 1024:>9.1f} {retained / 1024:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-page serialization cost of GET /users, before and after the single-pass encoder.
+
+    python -m benchmarks.bench_serialization [--repeat 50]
+
+"legacy" reproduces the old path: UserOut.model_validate(...).model_dump() per row, a PaginatedResponse,
+then FastAPI's jsonable_encoder + json.dumps. "current" is the column projection from projections.select_user_out plus responses.dumps.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from user.db import Base
+from user.models import User
+from user.projections import select_user_out, user_out_dict
+from user.responses import dumps
+from user.schemas import CursorPaginatedResponse, PaginatedResponse, UserOut
+
+LIMITS = (10, 100, 1000)
+
+def seed(session, count: int) -> None:
+    now = datetime.now(timezone.utc)
+    session.add_all([
+        User(email=f"user{i}@example.com", mobile="09123456789", firstName="Bench", middleName="Mark",
+             lastName=f"User{i}", completeName=f"Bench Mark User{i}", role="User", status="active", created_at=now)
+        for i in range(count)
+    ])
+    session.commit()
+
+def legacy(users: list[User]) -> bytes:
+    data = []
+    for user in users:
+        user_dict = UserOut.model_validate(user).model_dump()
+        user_dict["completeName"] = f"{user.firstName} {user.middleName or ''} {user.lastName}".strip()
+        data.append(user_dict)
+    page = PaginatedResponse(data=data, totalCount=len(users), limit=len(users), offset=0)
+    return json.dumps(jsonable_encoder(page)).encode()
+
+def current(rows: list) -> bytes:
+    page = CursorPaginatedResponse[UserOut].model_construct(
+        data=[user_out_dict(row) for row in rows], totalCount=len(rows), limit=len(rows), offset=0, nextCursor=None
+    )
+    return dumps(page)
+
+def measure(func, rows: list, repeat: int) -> float:
+    func(rows)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(rows)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    seed(session, max(LIMITS))
+
+    print(f"{'limit':>6} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+    for limit in LIMITS:
+        users = session.execute(select(User).order_by(User.id).limit(limit)).scalars().all()
+        rows = session.execute(select_user_out().order_by(User.id).limit(limit)).all()
+        assert json.loads(legacy(users))["data"] == json.loads(current(rows))["data"]
+        before = measure(legacy, users, args.repeat)
+        after = measure(current, rows, args.repeat)
+        print(f"{limit:>6} {before:>10.3f} {after:>11.3f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
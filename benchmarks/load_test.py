@@ -0,0 +1,265 @@
+"""
+Latency and throughput of the auth and user endpoints against a seeded temporary database.
+
+    python -m benchmarks.load_test [--users 10000] [--requests 500] [--concurrency 16] [--target asgi|uvicorn|both]
+                                   [--output results.json] [--compare previous.json]
+
+The database (a temporary SQLite file unless --database-url is given) is seeded with --users users sharing one
+bcrypt hash, so seeding 1M users takes seconds rather than hours. Each scenario sends --requests requests from
+--concurrency concurrent clients, either in process through httpx's ASGITransport (with the app's lifespan running,
+so the background audit writer is active) or over HTTP to a uvicorn subprocess.
+
+Run it once with USE_ASYNC_DB=true and once without to compare the async and sync database layers. The in-process
+target relies on the app's lifespan to dispose the engines, so both modes exit once the run is finished.
+
+p50/p95/p99 latency and requests per second are printed per scenario and saved as JSON together with the git
+commit, so a run can be compared with an earlier one through --compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+PASSWORD = "loadpass"
+SEED_CHUNK = 10000
+
+def configure_environment(database_url: str, workdir: Path) -> None:
+    # user.config reads the environment on import, so this runs before any user module is imported
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("LOG_FILE", str(workdir / "load_test.log"))
+    os.environ.setdefault("RETENTION_SWEEP_ENABLED", "false")
+    # Every simulated client shares one IP, so login throttling would turn the login scenario into 429s
+    os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "false")
+
+def seed(count: int) -> None:
+    from sqlalchemy import insert
+    from user.auth.auth import get_password_hash
+    from user.db import Base, engine
+    from user.models import Credential, User
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    hashed_password = get_password_hash(PASSWORD)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        for start in range(0, count, SEED_CHUNK):
+            ids = range(start + 1, min(start + SEED_CHUNK, count) + 1)
+            conn.execute(insert(User), [
+                {"id": i, "email": f"load{i}@example.com", "mobile": "09123456789", "firstName": "Load", "middleName": None,
+                 "lastName": f"User{i}", "completeName": f"Load User{i}", "role": "User",
+                 "status": "active" if i % 4 else "inactive", "created_at": now}
+                for i in ids
+            ])
+            conn.execute(insert(Credential), [
+                {"user_id": i, "username": f"loaduser{i}", "hashed_password": hashed_password, "created_at": now} for i in ids
+            ])
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "rps": count / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / count * 1000 if count else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+def scenarios(users: int) -> dict:
+    """Map scenario names to functions building (method, url, request kwargs) from a worker state."""
+    from user.crud import encode_cursor
+
+    deep_offset = max(users - 100, 0)
+
+    def login(state):
+        username = f"loaduser{random.randint(1, users)}"
+        return "POST", "/auth/token", {"data": {"username": username, "password": PASSWORD}}
+
+    def refresh(state):
+        return "POST", "/auth/token/refresh", {"json": {"refresh_token": state["refresh_token"]}}
+
+    def get_page(params):
+        return lambda state: ("GET", "/users", {"params": params, "headers": state["headers"]})
+
+    def get_user(state):
+        return "GET", f"/users/{random.randint(1, users)}", {"headers": state["headers"]}
+
+    def update_user(state):
+        return "PUT", f"/users/update/{random.randint(1, users)}", {"json": {"role": random.choice(("User", "Admin"))}, "headers": state["headers"]}
+
+    return {
+        "login": login,
+        "refresh": refresh,
+        "list_shallow": get_page({"limit": 20}),
+        "list_shallow_status": get_page({"limit": 20, "status": "active"}),
+        "list_deep_offset": get_page({"limit": 20, "offset": deep_offset}),
+        "list_deep_offset_status": get_page({"limit": 20, "offset": deep_offset * 3 // 4, "status": "active"}),
+        "list_deep_cursor": get_page({"limit": 20, "cursor": encode_cursor(deep_offset)}),
+        "get_user": get_user,
+        "update_user": update_user,
+    }
+
+async def new_session(client) -> dict:
+    response = await client.post("/auth/token", data={"username": "loaduser1", "password": PASSWORD})
+    response.raise_for_status()
+    tokens = response.json()
+    return {"headers": {"Authorization": f"Bearer {tokens['access_token']}"}, "refresh_token": tokens["refresh_token"]}
+
+async def run_scenario(client, name: str, build, requests: int, sessions: list[dict]) -> dict:
+    remaining = requests
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker(state):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, url, kwargs = build(state)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            elif name == "refresh":
+                state["refresh_token"] = response.json()["refresh_token"]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(state) for state in sessions))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+@asynccontextmanager
+async def asgi_client():
+    from httpx import ASGITransport, AsyncClient
+    from user.main import app
+
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://load-test", timeout=60) as client:
+            yield client
+
+@asynccontextmanager
+async def uvicorn_client(workers: int):
+    from httpx import AsyncClient
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "user.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=os.environ.copy()
+    )
+    try:
+        async with AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/docs")
+                    break
+                except Exception:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            yield client
+    finally:
+        server.terminate()
+        server.wait()
+
+async def run_target(target: str, args) -> dict:
+    client_context = asgi_client() if target == "asgi" else uvicorn_client(args.uvicorn_workers)
+    results = {}
+    async with client_context as client:
+        # One logged-in session per concurrent client, created before any timing starts
+        sessions = [await new_session(client) for _ in range(args.concurrency)]
+        for name, build in scenarios(args.users).items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            results[name] = await run_scenario(client, name, build, args.requests, sessions)
+            print_row(target, name, results[name])
+    return results
+
+def print_row(target: str, name: str, result: dict) -> None:
+    print(f"{target:>8} {name:>24} {result['rps']:>9.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+          f"{result['p99_ms']:>8.2f} {result['errors']:>6}")
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: dict, previous: dict) -> None:
+    print(f"\nChange against {previous['meta'].get('commit')} (negative latency / positive rps is better)")
+    for target, scenario_results in current["results"].items():
+        for name, result in scenario_results.items():
+            before = previous["results"].get(target, {}).get(name)
+            if not before:
+                continue
+            deltas = [
+                f"{key} {(result[key] - before[key]) / before[key] * 100:+.1f}%"
+                for key in ("rps", "p50_ms", "p99_ms") if before[key]
+            ]
+            print(f"{target:>8} {name:>24} " + "  ".join(deltas))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--target", choices=("asgi", "uvicorn", "both"), default="asgi")
+    parser.add_argument("--uvicorn-workers", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="*", help="only run these scenarios")
+    parser.add_argument("--database-url", help="seed and test this database instead of a temporary SQLite file (it is wiped)")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="compare with the JSON results of an earlier run")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the request mix")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory(prefix="user-load-test-") as workdir:
+        workdir = Path(workdir)
+        configure_environment(args.database_url or f"sqlite:///{workdir / 'load_test.db'}", workdir)
+        start = time.perf_counter()
+        seed(args.users)
+        print(f"Seeded {args.users} users in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'target':>8} {'scenario':>24} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        targets = ("asgi", "uvicorn") if args.target == "both" else (args.target,)
+        results = {target: asyncio.run(run_target(target, args)) for target in targets}
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "database": "sqlite" if not args.database_url else args.database_url.split(":", 1)[0],
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+if __name__ == "__main__":
+    main()
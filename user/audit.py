@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from .models import ActionLog
+from .db import engine
+from . import config
+
+logger = logging.getLogger("user-management")
+
+_STOP = object()
+
+class AuditLogWriter:
+    """
+    Background writer that batches ActionLog rows into bulk INSERTs.
+    Rows are put on a bounded queue and a worker thread flushes them when batch_size rows are waiting
+    or flush_interval seconds have passed, whichever comes first. stop() drains the queue before returning.
+    Args:
+        engine (Engine): The engine the rows are written with.
+        batch_size (int): The maximum number of rows per INSERT.
+        flush_interval (float): The longest time in seconds a row waits before being flushed.
+        max_queue_size (int): The number of rows that may wait to be written.
+        overflow_policy (str): "drop" discards rows when the queue is full, "block" waits up to block_timeout for room first.
+        block_timeout (float): How long the "block" policy waits in seconds before dropping the row.
+    """
+    def __init__(self, engine: Engine, batch_size: int = 100, flush_interval: float = 1.0, max_queue_size: int = 10000,
+                 overflow_policy: str = "drop", block_timeout: float = 0.5):
+        if overflow_policy not in ("drop", "block"):
+            raise ValueError(f"Unknown audit log overflow policy: {overflow_policy}")
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: threading.Thread | None = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Start the background flush thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Flush every queued row and stop the background thread."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    async def enqueue(self, row: dict) -> bool:
+        """Queue a row for writing. Returns False if the row was dropped because the queue is full."""
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            if self.overflow_policy != "block" or not await self._wait_for_room(row):
+                self.dropped += 1
+                return False
+        self.enqueued += 1
+        return True
+
+    async def _wait_for_room(self, row: dict) -> bool:
+        deadline = time.monotonic() + self.block_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+            try:
+                self._queue.put_nowait(row)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            if stopping:
+                batch.extend(self._drain())
+            for start in range(0, len(batch), self.batch_size):
+                self._flush(batch[start:start + self.batch_size])
+
+    def _drain(self) -> list[dict]:
+        rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return rows
+            if item is not _STOP:
+                rows.append(item)
+
+    def _flush(self, rows: list[dict]) -> None:
+        start = time.perf_counter()
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(ActionLog), rows)
+        except Exception as e:
+            self.failed += len(rows)
+            logger.error("Failed to write %s audit log rows: %s", len(rows), e)
+            return
+        elapsed = time.perf_counter() - start
+        self.written += len(rows)
+        self.batches += 1
+        self.max_batch_size = max(self.max_batch_size, len(rows))
+        self.flush_seconds += elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    def stats(self) -> dict:
+        """Return queue depth, drop and write counters, batch sizes and flush latency."""
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_size": self.written / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "flush_seconds_total": self.flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+        }
+
+audit_writer = AuditLogWriter(
+    engine,
+    batch_size=config.AUDIT_LOG_BATCH_SIZE,
+    flush_interval=config.AUDIT_LOG_FLUSH_INTERVAL_SECONDS,
+    max_queue_size=config.AUDIT_LOG_QUEUE_SIZE,
+    overflow_policy=config.AUDIT_LOG_OVERFLOW_POLICY,
+    block_timeout=config.AUDIT_LOG_BLOCK_TIMEOUT_SECONDS
+)
@@ -1,24 +1,30 @@
-from passlib.context import CryptContext
-from fastapi import status, APIRouter, Depends, Body
+import hmac
+import math
+from fastapi import status, APIRouter, Depends, Body, Header, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
+from jose import jwt
 from ..models import Credential, RefreshToken
-from ..schemas import UserOut, ActionLogEnum, ActionLogActionsEnum
-from ..db import get_db
+from ..schemas import UserOut, ActionLogEnum, ActionLogActionsEnum, TokenIntrospectRequest, TokenIntrospectResponse
+from ..responses import json_response
+from ..db import get_db, execute, commit, rollback
 from ..logger import logger, log_action
-from .token_utils import create_access_token, create_refresh_token, decode_token, generate_401_exception, verify_access_token
+from .. import config
+from .token_utils import (
+    create_access_token, create_refresh_token, decode_token, decode_access_token, generate_401_exception, hash_token, token_denylist
+)
+from .principal_cache import Principal, principal_cache
+from .introspection import token_introspector
+from .rate_limit import login_throttle
+from .hashing import pwd_context, password_hasher
 
 token_router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
-
-SECRET_KEY = "mysecretkey"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-ACCESS_TOKEN_EXPIRE_DAYS = 7
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
 
 def verify_password(plain_password, hashed_password):
     """Verify a plain password against a hashed password."""
@@ -27,60 +33,93 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(plain_password):
     """Hash a plain password using bcrypt."""
     return pwd_context.hash(plain_password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a plain password against a hashed password without blocking the event loop."""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash_async(plain_password):
+    """Hash a plain password using bcrypt without blocking the event loop."""
+    return await password_hasher.hash(plain_password)
     
-def authenticate_user(db: Session, username: str, plain_password: str) -> UserOut | None:
+async def authenticate_user(db: Session | AsyncSession, username: str, plain_password: str) -> UserOut | None:
     """Authenticate a user by username and password."""
-    credentials = db.query(Credential).filter(Credential.username == username).first()
-    if not credentials or not verify_password(plain_password, credentials.hashed_password):
+    statement = select(Credential).options(joinedload(Credential.user)).where(Credential.username == username)
+    credentials = (await execute(db, statement)).scalars().first()
+    if not credentials or not await verify_password_async(plain_password, credentials.hashed_password):
         return None
     return UserOut.model_validate(credentials.user).model_dump()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserOut | None:
-    """Get the current user based on the provided access token."""
-    user_id = verify_access_token(token)
-    user = db.query(Credential).filter(Credential.user_id == user_id).first()
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session | AsyncSession = Depends(get_db)) -> Principal:
+    """
+    Get the current user based on the provided access token.
+    Principals are cached by token jti until the token expires, so repeat calls skip the credential lookup and audit write.
+    """
+    payload = decode_access_token(token)
+    user_id = int(payload["sub"])
+    jti = payload.get("jti")
+    if jti:
+        principal = principal_cache.get(jti)
+        if principal is not None:
+            return principal
+
+    generation = principal_cache.generation(user_id)
+    user = (await execute(db, select(Credential).where(Credential.user_id == user_id))).scalars().first()
     if not user:
-        logger.warning(f"Token verification failed: User not found for user_id={user_id}")
-        log_action(db, user_id=user["id"], action=ActionLogEnum.verify_token, status=ActionLogActionsEnum.failed)
+        logger.warning("Token verification failed: User not found for user_id=%s", user_id)
+        await log_action(db, user_id=user_id, action=ActionLogEnum.verify_token, status=ActionLogActionsEnum.failed)
         raise generate_401_exception(detail="User not found")
-    logger.warning(f"Token verification success for user_id={user_id}")
-    log_action(db, user_id=user.id, action=ActionLogEnum.verify_token, status=ActionLogActionsEnum.success)
-    return user
+    logger.warning("Token verification success for user_id=%s", user_id)
+    await log_action(db, user_id=user.id, action=ActionLogEnum.verify_token, status=ActionLogActionsEnum.success)
+    principal = Principal(user_id=user.user_id, username=user.username)
+    if jti and payload.get("exp"):
+        principal_cache.set(jti, principal, exp=payload["exp"], generation=generation)
+    return principal
 
-def save_refresh_token(db: Session, refresh_token: str):
-    """Save the refresh token to the database."""
-    payload = decode_token(refresh_token)
+def build_refresh_token(refresh_token: str) -> RefreshToken:
+    """Build the row a refresh token is stored as. Only its SHA-256 digest is stored."""
+    # The token was just signed here, so its claims are read without verifying the signature again
+    payload = jwt.get_unverified_claims(refresh_token)
     expiry = datetime.fromtimestamp(payload.get("exp"), timezone.utc) if payload.get("exp") else None
     if not expiry or not payload.get("sub"):
         logger.error("Invalid refresh token payload")
         raise generate_401_exception(detail="Invalid refresh token payload")
-    
-    db_token = RefreshToken(
-        token=refresh_token,
-        user_id=payload.get("sub"),
-        expires_at=expiry
-    )
+    return RefreshToken(token_hash=hash_token(refresh_token), user_id=int(payload["sub"]), expires_at=expiry)
+
+async def save_refresh_token(db: Session | AsyncSession, refresh_token: str):
+    """Save the refresh token to the database. Only its SHA-256 digest is stored."""
+    db_token = build_refresh_token(refresh_token)
     try:
         db.add(db_token)
-        db.commit()
+        await commit(db)
     except Exception:
-        db.rollback()
+        await rollback(db)
         raise
     
 @token_router.post("/token", status_code=status.HTTP_200_OK, summary="Generate access token", description="Generate an access token for the user.")
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session | AsyncSession = Depends(get_db)):
+    ip = request.client.host if request.client else None
+    retry_after, rejections = login_throttle.acquire(form_data.username, ip)
+    if retry_after:
+        # Only the first rejection in a row becomes an audit row, the rest are counted in the throttle's stats
+        if rejections == 1:
+            logger.warning("Login throttled: username=%s, ip=%s", form_data.username, ip)
+            await log_action(db, username=form_data.username, ip=ip, action=ActionLogEnum.login, status=ActionLogActionsEnum.failed)
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many login attempts",
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
-        logger.warning(f"Failed login: username={form_data.username}")
-        log_action(db, username=form_data.username, action=ActionLogEnum.login, status=ActionLogActionsEnum.failed)
+        logger.warning("Failed login: username=%s", form_data.username)
+        await log_action(db, username=form_data.username, action=ActionLogEnum.login, status=ActionLogActionsEnum.failed)
         raise generate_401_exception(detail="Incorrect username or password")
     user_id = user.id if isinstance(user, UserOut) else user["id"]
     access_token = create_access_token(data={"sub": str(user_id)})
     refresh_token = create_refresh_token(data={"sub": str(user_id)})
-    save_refresh_token(db, refresh_token)
+    await save_refresh_token(db, refresh_token)
 
-    logger.info(f"Token issued: user_id={str(user['id'])}")
-    log_action(db, user_id=user["id"], action=ActionLogEnum.login, status=ActionLogActionsEnum.success)
+    logger.info("Token issued: user_id=%s", user['id'])
+    await log_action(db, user_id=user["id"], action=ActionLogEnum.login, status=ActionLogActionsEnum.success)
     return {
         "access_token": access_token, 
         "token_type": "bearer", 
@@ -88,8 +127,8 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     }
 
 @token_router.post("/token/refresh", status_code=status.HTTP_200_OK, summary="Refresh access token", description="Refresh the provided access token and return a new one.")
-async def refresh_access_token(refresh_token: str = Body(embed=True), db: Session = Depends(get_db)):
-    logger.info(f"Refresh token verification attempt")
+async def refresh_access_token(refresh_token: str = Body(embed=True), db: Session | AsyncSession = Depends(get_db)):
+    logger.info("Refresh token verification attempt")
     if not refresh_token or refresh_token.lower() == "undefined":
         logger.warning("Refresh token verification failed: Invalid or missing token")
         raise generate_401_exception("Invalid or missing refresh token")
@@ -97,30 +136,106 @@ async def refresh_access_token(refresh_token: str = Body(embed=True), db: Sessio
     payload = decode_token(refresh_token)
     user_id = payload.get("sub")
     if payload.get("token_type") != "refresh":
-        logger.warning(f"Refresh token verification failed: Invalid token type")
+        logger.warning("Refresh token verification failed: Invalid token type")
         raise generate_401_exception(detail="Invalid token type")
     if not user_id:
-        logger.warning(f"Refresh token verification failed: User not found for user_id={user_id}")
+        logger.warning("Refresh token verification failed: User not found for user_id=%s", user_id)
         raise generate_401_exception(detail="User not found in refresh token")
         
-    db_token = db.query(RefreshToken).filter(RefreshToken.token == refresh_token).first()
-    if not db_token or db_token.revoked or db_token.expires_at.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc):
-        logger.warning(f"Refresh token verification failed: Token invalid/expired for user_id={user_id}")
-        raise generate_401_exception(detail="Refresh token is invalid or expired")
-    
-    db_token.revoked = True
-    db.commit()
-    db.refresh(db_token)
-    
+    # Revoking with a conditional UPDATE makes rotation race-free: of two concurrent refreshes with the same
+    # token only one matches the row, and the replacement is inserted in the same transaction
+    statement = (
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_token(refresh_token),
+            RefreshToken.revoked.is_(False),
+            RefreshToken.expires_at > datetime.now(timezone.utc)
+        )
+        .values(revoked=True)
+        .returning(RefreshToken.user_id)
+        .execution_options(synchronize_session=False)
+    )
     new_access_token = create_access_token({"sub": user_id})
     new_refresh_token = create_refresh_token({"sub": user_id})
+    try:
+        revoked_user_id = (await execute(db, statement)).scalar_one_or_none()
+        if revoked_user_id is None or str(revoked_user_id) != str(user_id):
+            await rollback(db)
+            logger.warning("Refresh token verification failed: Token invalid/expired for user_id=%s", user_id)
+            raise generate_401_exception(detail="Refresh token is invalid or expired")
+        db.add(build_refresh_token(new_refresh_token))
+        await commit(db)
+    except HTTPException:
+        raise
+    except Exception:
+        await rollback(db)
+        raise
+    principal_cache.invalidate_user(user_id)
 
-    save_refresh_token(db, new_refresh_token)
-
-    logger.info(f"Token issued: user_id={user_id}")
+    logger.info("Token issued: user_id=%s", user_id)
     return {
         "access_token": new_access_token,
         "refresh_token": new_refresh_token,
         "token_type": "bearer"
     }
 
+
+async def authorize_introspection(client_secret: str | None = Header(None, alias="X-Client-Secret"), token: str | None = Depends(optional_oauth2_scheme),
+                                  db: Session | AsyncSession = Depends(get_db)) -> None:
+    """Let a gateway presenting TOKEN_INTROSPECT_CLIENT_SECRET or a signed-in user introspect tokens."""
+    if client_secret is not None:
+        if config.TOKEN_INTROSPECT_CLIENT_SECRET and hmac.compare_digest(client_secret.encode(), config.TOKEN_INTROSPECT_CLIENT_SECRET.encode()):
+            return
+        logger.warning("Token introspection rejected: invalid client secret")
+        raise generate_401_exception(detail="Invalid client secret")
+    if not token:
+        raise generate_401_exception(detail="Token introspection requires a client secret or an access token")
+    await get_current_user(token, db)
+
+@token_router.post("/token/introspect", response_model=TokenIntrospectResponse, summary="Introspect access tokens", dependencies=[Depends(authorize_introspection)],
+                   description="Check up to TOKEN_INTROSPECT_MAX_TOKENS access tokens at once. Results are returned in request order. "
+                               "Callers authenticate with the X-Client-Secret header or a bearer access token.")
+async def introspect_tokens(body: TokenIntrospectRequest):
+    if len(body.tokens) > config.TOKEN_INTROSPECT_MAX_TOKENS:
+        raise HTTPException(status_code=413, detail=f"At most {config.TOKEN_INTROSPECT_MAX_TOKENS} tokens can be introspected at once")
+    # Signature checks only: no database query and no audit row per token
+    results = [token_introspector.introspect(token) for token in body.tokens]
+    logger.info("Introspected %s tokens, %s active", len(results), sum(result["active"] for result in results))
+    return json_response({"data": results})
+
+async def revoke_refresh_tokens(db: Session | AsyncSession, user_id: int, refresh_token: str | None = None) -> int:
+    """Revoke a user's refresh tokens (only the given one when passed) in one UPDATE and return how many were revoked."""
+    statement = update(RefreshToken).where(RefreshToken.user_id == user_id, RefreshToken.revoked.is_(False))
+    if refresh_token is not None:
+        statement = statement.where(RefreshToken.token_hash == hash_token(refresh_token))
+    try:
+        revoked = (await execute(db, statement.values(revoked=True).execution_options(synchronize_session=False))).rowcount
+        await commit(db)
+    except Exception:
+        await rollback(db)
+        raise
+    return revoked
+
+@token_router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, summary="Log out",
+                   description="Revoke the presented access token and, when given, its refresh token.")
+async def logout(refresh_token: str | None = Body(default=None, embed=True), token: str = Depends(oauth2_scheme),
+                 db: Session | AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    payload = decode_access_token(token)
+    token_denylist.revoke(payload["jti"], payload["exp"])
+    if refresh_token:
+        await revoke_refresh_tokens(db, current_user.user_id, refresh_token)
+    principal_cache.invalidate_user(current_user.user_id)
+
+    logger.info("Logged out: user_id=%s", current_user.user_id)
+    await log_action(db, user_id=current_user.user_id, username=current_user.username, action=ActionLogEnum.logout, status=ActionLogActionsEnum.success)
+
+@token_router.post("/sessions/revoke-all", status_code=status.HTTP_200_OK, summary="Revoke all sessions",
+                   description="Revoke every refresh token of the current user and every access token issued so far, including the presented one.")
+async def revoke_all_sessions(db: Session | AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    token_denylist.revoke_user(current_user.user_id)
+    revoked = await revoke_refresh_tokens(db, current_user.user_id)
+    principal_cache.invalidate_user(current_user.user_id)
+
+    logger.info("Revoked all sessions: user_id=%s, refresh_tokens=%s", current_user.user_id, revoked)
+    await log_action(db, user_id=current_user.user_id, username=current_user.username, action=ActionLogEnum.logout, status=ActionLogActionsEnum.success)
+    return {"revoked_refresh_tokens": revoked}
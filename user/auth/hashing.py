@@ -0,0 +1,109 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from .. import config
+from ..metrics import record_bcrypt
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _timed_hash(plain_password: str) -> tuple[str, float]:
+    """Hash a password inside a worker and report the time spent hashing."""
+    start = time.perf_counter()
+    hashed_password = pwd_context.hash(plain_password)
+    return hashed_password, time.perf_counter() - start
+
+def _timed_verify(plain_password: str, hashed_password: str) -> tuple[bool, float]:
+    """Verify a password inside a worker and report the time spent verifying."""
+    start = time.perf_counter()
+    verified = pwd_context.verify(plain_password, hashed_password)
+    return verified, time.perf_counter() - start
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a bounded worker pool so the event loop is never blocked.
+    Args:
+        pool_kind (str): "thread" or "process".
+        max_workers (int): The number of workers computing hashes concurrently.
+        queue_depth (int): How many calls may wait for a free worker before new calls are rejected with a 503.
+    """
+    def __init__(self, pool_kind: str = "thread", max_workers: int = 2, queue_depth: int = 32):
+        if pool_kind not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash pool kind: {pool_kind}")
+        self.pool_kind = pool_kind
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.calls = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.compute_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.pool_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _submit(self, func, *args):
+        if self._in_flight >= self.max_workers + self.queue_depth:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing service is busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+        self._in_flight += 1
+        submitted = time.perf_counter()
+        try:
+            result, compute_seconds = await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+
+        elapsed = time.perf_counter() - submitted
+        self.calls += 1
+        self.compute_seconds += compute_seconds
+        self.wait_seconds += max(elapsed - compute_seconds, 0.0)
+        record_bcrypt(elapsed)
+        return result
+
+    async def hash(self, plain_password: str) -> str:
+        """Hash a plain password using bcrypt on the worker pool."""
+        return await self._submit(_timed_hash, plain_password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a plain password against a hashed password on the worker pool."""
+        return await self._submit(_timed_verify, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """Return counters for the pool: calls, rejections, queue usage and wait versus compute time."""
+        return {
+            "pool_kind": self.pool_kind,
+            "max_workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": self._in_flight,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds,
+            "compute_seconds_total": self.compute_seconds,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker pool. It is recreated lazily on the next call."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(
+    pool_kind=config.PASSWORD_HASH_POOL,
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    queue_depth=config.PASSWORD_HASH_QUEUE_DEPTH
+)
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from ..cache import TTLCache
+from .. import config
+from .token_utils import decode_access_token, hash_token, token_denylist
+
+INACTIVE = {"active": False, "sub": None, "exp": None}
+
+class TokenIntrospector:
+    """
+    Answers whether access tokens are active without touching the database.
+    Results are cached by the token's SHA-256 digest: active tokens until their exp (at most ttl),
+    rejected tokens for negative_ttl, so a gateway re-checking the same tokens only pays for the signature once.
+    Cached active results are still checked against the denylist, so a logout takes effect immediately.
+    Args:
+        maxsize (int): The maximum number of cached results per cache.
+        ttl (float): The longest an active result is cached, in seconds.
+        negative_ttl (float): How long an inactive result is cached, in seconds.
+    """
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self._active = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inactive = TTLCache(maxsize=maxsize, ttl=negative_ttl)
+
+    def introspect(self, token: str) -> dict:
+        """Return {"active", "sub", "exp"} for a token. Invalid, expired and non-access tokens are inactive."""
+        key = hash_token(token)
+        entry = self._active.get(key)
+        if entry is not None:
+            result, payload = entry
+            if not token_denylist.is_revoked(payload):
+                return result
+            self._active.pop(key)
+            self._inactive.set(key, True)
+            return INACTIVE
+        if self._inactive.get(key) is not None:
+            return INACTIVE
+
+        try:
+            payload = decode_access_token(token)
+        except HTTPException:
+            self._inactive.set(key, True)
+            return INACTIVE
+        result = {"active": True, "sub": int(payload["sub"]), "exp": payload.get("exp")}
+        if result["exp"]:
+            self._active.set(key, (result, payload), ttl=result["exp"] - datetime.now(timezone.utc).timestamp())
+        return result
+
+    def clear(self) -> None:
+        self._active.clear()
+        self._inactive.clear()
+
+    def stats(self) -> dict:
+        return {"active": self._active.stats(), "inactive": self._inactive.stats()}
+
+token_introspector = TokenIntrospector(
+    maxsize=config.TOKEN_INTROSPECT_CACHE_MAX_ENTRIES,
+    ttl=config.TOKEN_INTROSPECT_CACHE_TTL_SECONDS,
+    negative_ttl=config.TOKEN_INTROSPECT_NEGATIVE_TTL_SECONDS
+)
@@ -0,0 +1,121 @@
+"""
+Signing keys for access and refresh tokens.
+
+With an asymmetric JWT_ALGORITHM (RS256/RS384/RS512 or ES256/ES384/ES512) keys are read from JWT_KEYS_DIR, one PEM file
+per key named <kid>.pem. Private keys can sign, public keys only verify, so a retired key can be kept as its public half
+until the tokens it signed have expired. JWT_ACTIVE_KID picks the signing key (the last private key by name when unset).
+Public keys are published on /.well-known/jwks.json so other services can verify tokens without calling this API.
+
+Generate a key to rotate to with:
+
+    python -m user.auth.keys generate keys/ [--algorithm RS256]
+"""
+import argparse
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from jose import jwk
+from jose.backends.base import Key
+from .. import config
+
+SYMMETRIC_ALGORITHMS = ("HS256", "HS384", "HS512")
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "ES512")
+
+@dataclass(frozen=True, slots=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    key: Key
+    can_sign: bool
+    verification_key: Key  # the public half of an asymmetric key, derived once instead of on every decode
+
+    def public_jwk(self) -> dict:
+        """The key's public half as a JWK, with its kid."""
+        return {**self.verification_key.to_dict(), "kid": self.kid, "use": "sig"}
+
+class KeyRing:
+    """
+    The keys tokens are signed with and verified against, parsed once into jose Key objects.
+    Args:
+        keys (list[SigningKey]): Every key that may verify a token.
+        active_kid (str): The kid of the key new tokens are signed with.
+    """
+    def __init__(self, keys: list[SigningKey], active_kid: str):
+        self._keys = {key.kid: key for key in keys}
+        if active_kid not in self._keys or not self._keys[active_kid].can_sign:
+            raise ValueError(f"Signing key {active_kid!r} is not a private key in the key ring")
+        self.active = self._keys[active_kid]
+
+    def get(self, kid: str | None) -> SigningKey | None:
+        """Return the key a token names in its kid header. Tokens without a kid are checked against the active key."""
+        return self.active if kid is None else self._keys.get(kid)
+
+    def jwks(self) -> dict:
+        """Return the public keys as a JWK Set. Symmetric keys are never published."""
+        return {"keys": [key.public_jwk() for key in self._keys.values() if key.algorithm not in SYMMETRIC_ALGORITHMS]}
+
+    @classmethod
+    def from_secret(cls, secret: str, algorithm: str = "HS256", kid: str = "default") -> "KeyRing":
+        key = jwk.construct(secret, algorithm)
+        return cls([SigningKey(kid, algorithm, key, can_sign=True, verification_key=key)], kid)
+
+    @classmethod
+    def from_directory(cls, directory: Path, algorithm: str, active_kid: str | None = None) -> "KeyRing":
+        """Load every <kid>.pem in directory."""
+        keys = []
+        for path in sorted(directory.glob("*.pem")):
+            pem = path.read_bytes()
+            key = jwk.construct(pem, algorithm)
+            can_sign = b"PRIVATE KEY" in pem
+            keys.append(SigningKey(path.stem, algorithm, key, can_sign, verification_key=key.public_key() if can_sign else key))
+        if not keys:
+            raise ValueError(f"No *.pem keys found in {directory}")
+        if active_kid is None:
+            signing_kids = [key.kid for key in keys if key.can_sign]
+            active_kid = signing_kids[-1] if signing_kids else ""
+        return cls(keys, active_kid)
+
+def load_key_ring() -> KeyRing:
+    """Build the key ring from JWT_ALGORITHM, JWT_SECRET_KEY, JWT_KEYS_DIR and JWT_ACTIVE_KID."""
+    if config.JWT_ALGORITHM in SYMMETRIC_ALGORITHMS:
+        return KeyRing.from_secret(config.JWT_SECRET_KEY, config.JWT_ALGORITHM)
+    if config.JWT_ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        raise ValueError(f"Unsupported JWT algorithm: {config.JWT_ALGORITHM}")
+    if not config.JWT_KEYS_DIR:
+        raise ValueError(f"JWT_KEYS_DIR must be set to use {config.JWT_ALGORITHM}")
+    return KeyRing.from_directory(Path(config.JWT_KEYS_DIR), config.JWT_ALGORITHM, config.JWT_ACTIVE_KID)
+
+key_ring = load_key_ring()
+
+def generate_key(directory: Path, algorithm: str) -> Path:
+    """Write a new private key named after the current time to directory."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if algorithm.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        curves = {"ES256": ec.SECP256R1(), "ES384": ec.SECP384R1(), "ES512": ec.SECP521R1()}
+        private_key = ec.generate_private_key(curves[algorithm])
+    pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{datetime.now(timezone.utc):%Y%m%d%H%M%S}.pem"
+    path.write_bytes(pem)
+    path.chmod(0o600)
+    return path
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    generate = subcommands.add_parser("generate", help="write a new private key to a key directory")
+    generate.add_argument("directory", type=Path)
+    generate.add_argument("--algorithm", choices=ASYMMETRIC_ALGORITHMS, default="RS256")
+    args = parser.parse_args(argv)
+
+    print(generate_key(args.directory, args.algorithm))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
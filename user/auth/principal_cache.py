@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from ..cache import TTLCache
+from .. import config
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The authenticated caller resolved from an access token."""
+    user_id: int
+    username: str
+
+class PrincipalCache:
+    """
+    Caches verified principals by access token jti so repeated requests skip the database.
+    An entry never outlives the token's exp. invalidate_user() drops every cached principal
+    of a user by bumping a per-user generation, so it does not need to know the user's jtis.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: dict[int, int] = {}
+        self.invalidations = 0
+
+    def get(self, jti: str) -> Principal | None:
+        entry = self._cache.get(jti)
+        if entry is None:
+            return None
+        principal, generation = entry
+        if generation != self.generation(principal.user_id):
+            self._cache.pop(jti)
+            return None
+        return principal
+
+    def generation(self, user_id: int) -> int:
+        """Return the current generation of a user. Capture it before resolving a principal from the database."""
+        return self._generations.get(int(user_id), 0)
+
+    def set(self, jti: str, principal: Principal, exp: int | float, generation: int) -> None:
+        """Cache a principal until the token's exp, tagged with the generation captured before it was loaded."""
+        remaining = exp - datetime.now(timezone.utc).timestamp()
+        self._cache.set(jti, (principal, generation), ttl=remaining)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Forget every cached principal of a user, e.g. after a profile, password or token change."""
+        self._generations[int(user_id)] = self._generations.get(int(user_id), 0) + 1
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._generations.clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "invalidations": self.invalidations}
+
+principal_cache = PrincipalCache(maxsize=config.PRINCIPAL_CACHE_MAX_ENTRIES, ttl=config.PRINCIPAL_CACHE_TTL_SECONDS)
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+from .. import config
+
+class TokenBucketLimiter:
+    """
+    Thread-safe token buckets per key. Each key starts with burst tokens and regains rate_per_minute of them
+    per minute, and every allowed request takes one.
+    Args:
+        burst (int): The bucket capacity, i.e. how many requests a key may make back to back.
+        rate_per_minute (float): How fast a bucket refills.
+        max_keys (int): The maximum number of buckets kept. The least recently used bucket is dropped first.
+    """
+    def __init__(self, burst: int, rate_per_minute: float, max_keys: int):
+        self.burst = burst
+        self.rate = rate_per_minute / 60
+        self.max_keys = max_keys
+        # Per key: tokens left, when they were counted, and rejections since the key was last allowed
+        self._buckets: OrderedDict[Hashable, list] = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    def acquire(self, key: Hashable) -> tuple[float, int]:
+        """
+        Take a token for key.
+        Returns:
+            tuple[float, int]: 0 and 0 when allowed, otherwise the seconds until a token is available
+                               and how many requests of this key have been rejected in a row.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                bucket[2] = 0
+                self.allowed += 1
+                return 0.0, 0
+            bucket[2] += 1
+            self.rejected += 1
+            retry_after = (1 - bucket[0]) / self.rate if self.rate > 0 else float("inf")
+            return retry_after, bucket[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        return {"keys": len(self._buckets), "allowed": self.allowed, "rejected": self.rejected}
+
+class LoginThrottle:
+    """
+    Admission control for /auth/token, checked before any database query or password hash.
+    Attempts are limited per client IP (credential stuffing from one host) and per username
+    (one account attacked from many hosts).
+    """
+    def __init__(self, enabled: bool, by_ip: TokenBucketLimiter, by_username: TokenBucketLimiter):
+        self.enabled = enabled
+        self.by_ip = by_ip
+        self.by_username = by_username
+
+    def acquire(self, username: str, ip: str | None) -> tuple[float, int]:
+        """Return the seconds to wait and the rejections in a row for a login attempt, or 0 and 0 when it may proceed."""
+        if not self.enabled:
+            return 0.0, 0
+        retry_after, rejections = self.by_ip.acquire(ip)
+        if retry_after:
+            return retry_after, rejections
+        return self.by_username.acquire(username.lower())
+
+    def clear(self) -> None:
+        self.by_ip.clear()
+        self.by_username.clear()
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "ip": self.by_ip.stats(), "username": self.by_username.stats()}
+
+login_throttle = LoginThrottle(
+    enabled=config.LOGIN_RATE_LIMIT_ENABLED,
+    by_ip=TokenBucketLimiter(config.LOGIN_RATE_LIMIT_IP_BURST, config.LOGIN_RATE_LIMIT_IP_PER_MINUTE, config.LOGIN_RATE_LIMIT_MAX_KEYS),
+    by_username=TokenBucketLimiter(config.LOGIN_RATE_LIMIT_USERNAME_BURST, config.LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE, config.LOGIN_RATE_LIMIT_MAX_KEYS)
+)
@@ -0,0 +1,61 @@
+import threading
+import time
+
+class TokenDenylist:
+    """
+    In-memory record of revoked access tokens, checked on every verification without a database query.
+    A single token is revoked by jti until its exp. Revoking every session of a user stores one cutoff instead,
+    and tokens issued (iat) at or before it are rejected, so the user's outstanding jtis need not be known.
+    Entries are dropped once the tokens they cover have expired. The denylist is per process.
+    Args:
+        access_token_lifetime (float): Seconds an access token is valid, i.e. how long a per-user cutoff must be kept.
+    """
+    def __init__(self, access_token_lifetime: float):
+        self.access_token_lifetime = access_token_lifetime
+        self._jtis: dict[str, float] = {}
+        self._revoked_before: dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        self.rejections = 0
+
+    def revoke(self, jti: str, exp: float) -> None:
+        """Reject the token with this jti until its exp."""
+        with self._lock:
+            self._jtis[jti] = exp
+            self._purge()
+
+    def revoke_user(self, user_id: int, before: float | None = None) -> None:
+        """Reject every token of a user issued at or before the given time (now when omitted)."""
+        before = time.time() if before is None else before
+        with self._lock:
+            self._revoked_before[int(user_id)] = max(before, self._revoked_before.get(int(user_id), 0.0))
+            self._purge()
+
+    def is_revoked(self, payload: dict) -> bool:
+        """Check a decoded token's jti, sub and iat against the denylist."""
+        if payload.get("jti") in self._jtis:
+            self.rejections += 1
+            return True
+        cutoff = self._revoked_before.get(int(payload["sub"])) if payload.get("sub") else None
+        # Tokens without an iat predate revoke-all support and are treated as issued before any cutoff
+        if cutoff is not None and payload.get("iat", 0) <= cutoff:
+            self.rejections += 1
+            return True
+        return False
+
+    def _purge(self) -> None:
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + 60
+        self._jtis = {jti: exp for jti, exp in self._jtis.items() if exp > now}
+        horizon = now - self.access_token_lifetime
+        self._revoked_before = {user_id: cutoff for user_id, cutoff in self._revoked_before.items() if cutoff > horizon}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._jtis.clear()
+            self._revoked_before.clear()
+
+    def stats(self) -> dict:
+        return {"jtis": len(self._jtis), "users": len(self._revoked_before), "rejections": self.rejections}
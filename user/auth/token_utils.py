@@ -4,14 +4,20 @@ from fastapi import HTTPException, status
 import logging
 from typing import Literal
 import uuid
+import hashlib
+from .keys import key_ring
+from .revocation import TokenDenylist
+from .. import config
 
 logger = logging.getLogger(__name__)
 
-SECRET_KEY = "mysecretkey"
-ALGORITHM = "HS256"
+SECRET_KEY = config.JWT_SECRET_KEY
+ALGORITHM = config.JWT_ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 ACCESS_TOKEN_EXPIRE_DAYS = 7
 
+token_denylist = TokenDenylist(access_token_lifetime=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
 def generate_401_exception(detail: str):
     """Generate a 401 HTTPException with the given detail."""
     return HTTPException(
@@ -20,15 +26,23 @@ def generate_401_exception(detail: str):
         headers={"WWW-Authenticate": "Bearer"}
     )
 
+def hash_token(token: str) -> str:
+    """Return the SHA-256 hex digest a refresh token is stored and looked up by."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def create_token(data: dict, expires_delta: timedelta, token_type: Literal["access", "refresh"]) -> str:
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + expires_delta
+    now = datetime.now(timezone.utc)
+    expire = now + expires_delta
     to_encode.update({
+        # Sub-second iat so a revoke-all cutoff does not also catch tokens issued later in the same second
+        "iat": now.timestamp(),
         "exp": expire,
         "token_type": token_type,
         "jti": str(uuid.uuid4())
     })
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    signing_key = key_ring.active
+    return jwt.encode(to_encode, signing_key.key, algorithm=signing_key.algorithm, headers={"kid": signing_key.kid})
 
 def create_access_token(data: dict) -> str:
     return create_token(data, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES), "access")
@@ -38,16 +52,21 @@ def create_refresh_token(data: dict) -> str:
 
 def decode_token(token: str) -> dict:
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # The kid header picks the verification key, so tokens signed before a rotation stay valid
+        signing_key = key_ring.get(jwt.get_unverified_header(token).get("kid"))
+        if signing_key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, signing_key.verification_key, algorithms=[signing_key.algorithm])
     except ExpiredSignatureError:
         logger.warning("Token expired")
         raise generate_401_exception(detail="Token has expired")
     except JWTError as e:
-        logger.warning(f"Token invalid: {str(e)}")
+        logger.warning("Token invalid: %s", e)
         raise generate_401_exception(detail="Invalid token")
     
-def verify_access_token(token: str):
-    logger.info(f"Access token verification attempt")
+def decode_access_token(token: str) -> dict:
+    """Validate an access token and return its payload."""
+    logger.info("Access token verification attempt")
     if not token or token.lower() == "undefined":
         logger.warning("Access token verification failed: Invalid or missing token")
         raise generate_401_exception("Invalid or missing access token")
@@ -62,5 +81,11 @@ def verify_access_token(token: str):
     elif token_type != "access":
         logger.warning("Access token verification failed: Invalid token type")
         raise generate_401_exception("Invalid token type")
+    elif token_denylist.is_revoked(payload):
+        logger.warning("Access token verification failed: Token has been revoked")
+        raise generate_401_exception("Token has been revoked")
 
-    return int(user_id)
+    return payload
+
+def verify_access_token(token: str):
+    return int(decode_access_token(token)["sub"])
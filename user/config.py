@@ -0,0 +1,104 @@
+import os
+from dotenv import load_dotenv
+
+# Settings come from the environment, optionally seeded from a .env file in the working directory.
+load_dotenv()
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# Password hashing worker pool
+PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "thread")  # "thread" or "process"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", "32"))
+
+# Database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./user_management.db")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")  # derived from DATABASE_URL when unset
+USE_ASYNC_DB = _env_bool("USE_ASYNC_DB", False)
+
+# Connection pool, used for server databases such as PostgreSQL
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+# SQLite connection profile, applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))  # negative values are KiB
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+SQLITE_READ_ONLY_POOL = _env_bool("SQLITE_READ_ONLY_POOL", False)
+
+# Verified-principal cache for get_current_user
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+
+# Batched audit log writer
+AUDIT_LOG_BATCHING = _env_bool("AUDIT_LOG_BATCHING", True)
+AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "100"))
+AUDIT_LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL_SECONDS", "1.0"))
+AUDIT_LOG_QUEUE_SIZE = int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000"))
+AUDIT_LOG_OVERFLOW_POLICY = os.getenv("AUDIT_LOG_OVERFLOW_POLICY", "drop")  # "drop" or "block"
+AUDIT_LOG_BLOCK_TIMEOUT_SECONDS = float(os.getenv("AUDIT_LOG_BLOCK_TIMEOUT_SECONDS", "0.5"))
+
+# Cached totalCount for GET /users
+USER_COUNT_CACHE_TTL_SECONDS = float(os.getenv("USER_COUNT_CACHE_TTL_SECONDS", "30"))
+
+# Background purge of expired/revoked refresh tokens and old audit rows
+RETENTION_SWEEP_ENABLED = _env_bool("RETENTION_SWEEP_ENABLED", True)
+RETENTION_SWEEP_INTERVAL_SECONDS = float(os.getenv("RETENTION_SWEEP_INTERVAL_SECONDS", "3600"))
+RETENTION_SWEEP_BATCH_SIZE = int(os.getenv("RETENTION_SWEEP_BATCH_SIZE", "500"))
+RETENTION_SWEEP_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_SWEEP_BATCH_PAUSE_SECONDS", "0.05"))
+ACTION_LOG_RETENTION_DAYS = float(os.getenv("ACTION_LOG_RETENTION_DAYS", "90"))  # 0 keeps audit rows forever
+SQLITE_INCREMENTAL_VACUUM_PAGES = int(os.getenv("SQLITE_INCREMENTAL_VACUUM_PAGES", "0"))  # needs PRAGMA auto_vacuum=INCREMENTAL
+
+# POST /users/register/bulk and the user import command
+BULK_REGISTER_MAX_USERS = int(os.getenv("BULK_REGISTER_MAX_USERS", "100"))  # each user is a bcrypt hash on the shared pool
+BULK_REGISTER_BATCH_SIZE = int(os.getenv("BULK_REGISTER_BATCH_SIZE", "500"))
+
+# POST /users/batch
+USER_BATCH_MAX_IDS = int(os.getenv("USER_BATCH_MAX_IDS", "500"))
+
+# Serialized GET /users/{user_id} payloads
+USER_CACHE_MAX_BYTES = int(os.getenv("USER_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))  # 0 disables the cache
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+# Application log, written by a background QueueListener
+LOG_FILE = os.getenv("LOG_FILE", "user_actions.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # 0 never rotates
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "user.auth.token_utils=0.01")
+
+# Request metrics served on GET /metrics
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+
+# Token signing. Asymmetric algorithms read <kid>.pem keys from JWT_KEYS_DIR and publish them on /.well-known/jwks.json
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")  # HS256, RS256 or ES256 (and their 384/512 variants)
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "mysecretkey")  # only used by HS* algorithms
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")  # the last private key by file name when unset
+JWKS_MAX_AGE_SECONDS = int(os.getenv("JWKS_MAX_AGE_SECONDS", "300"))
+
+# POST /auth/token/introspect
+TOKEN_INTROSPECT_MAX_TOKENS = int(os.getenv("TOKEN_INTROSPECT_MAX_TOKENS", "100"))
+TOKEN_INTROSPECT_CLIENT_SECRET = os.getenv("TOKEN_INTROSPECT_CLIENT_SECRET")  # sent by gateways as X-Client-Secret; unset allows only bearer tokens
+TOKEN_INTROSPECT_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_INTROSPECT_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_INTROSPECT_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_INTROSPECT_CACHE_TTL_SECONDS", "60"))
+TOKEN_INTROSPECT_NEGATIVE_TTL_SECONDS = float(os.getenv("TOKEN_INTROSPECT_NEGATIVE_TTL_SECONDS", "10"))
+
+# Token-bucket throttling of POST /auth/token, applied before any database or bcrypt work
+LOGIN_RATE_LIMIT_ENABLED = _env_bool("LOGIN_RATE_LIMIT_ENABLED", True)
+LOGIN_RATE_LIMIT_IP_BURST = int(os.getenv("LOGIN_RATE_LIMIT_IP_BURST", "20"))
+LOGIN_RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("LOGIN_RATE_LIMIT_IP_PER_MINUTE", "60"))
+LOGIN_RATE_LIMIT_USERNAME_BURST = int(os.getenv("LOGIN_RATE_LIMIT_USERNAME_BURST", "5"))
+LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE", "5"))
+LOGIN_RATE_LIMIT_MAX_KEYS = int(os.getenv("LOGIN_RATE_LIMIT_MAX_KEYS", "100000"))
@@ -1,51 +1,238 @@
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .models import User, Credential
-from .schemas import UserOut, PaginatedResponse, UserCreate, UserUpdate
-from .auth.auth import get_password_hash, verify_password
-from typing import Optional
+from .db import execute, flush, commit, rollback, refresh
+from .responses import dumps
+from .projections import select_user_out, user_out_dict
+from .schemas import UserOut, CursorPaginatedResponse, UserCreate, UserUpdate, TotalCountEnum, StatusEnum, BulkRegisterResponse, BulkRegisterError, UserBatchResponse
+from .auth.auth import get_password_hash_async, verify_password_async
+from .auth.hashing import PasswordHasher, password_hasher
+from .auth.principal_cache import principal_cache
+from .cache import BytesLRUCache, CacheBackend, CounterCache
+from . import config
+from typing import List, Optional
 from datetime import datetime, timezone
+import asyncio
+import base64
+import hashlib
+import json
 
-def get_all_users(db: Session, offset: int = 0, limit: int = 20, status: Optional[str] = None) -> PaginatedResponse:
+user_counts = CounterCache(ttl=config.USER_COUNT_CACHE_TTL_SECONDS)
+# Serialized UserOut payloads keyed by "user:<id>". Replace with a shared CacheBackend when running several workers.
+user_cache: CacheBackend = BytesLRUCache(max_bytes=config.USER_CACHE_MAX_BYTES, ttl=config.USER_CACHE_TTL_SECONDS)
+_user_cache_epoch = 0
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Encode the position after a row into an opaque pagination cursor.
+    Args:
+        last_id (int): The ID of the last user on the current page.
+
+    Returns:
+        str: A URL-safe cursor to pass back as the `cursor` query parameter.
+    """
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a pagination cursor produced by encode_cursor.
+    Args:
+        cursor (str): The opaque cursor.
+
+    Returns:
+        int: The ID of the last user on the previous page.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(payload["id"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+async def count_users(db: Session | AsyncSession, status: Optional[str] = None, mode: TotalCountEnum = TotalCountEnum.exact) -> int | None:
+    """
+    Count users matching the status filter, served from per-status cached counters.
+    Args:
+        db (Session | AsyncSession): The database session.
+        status (Optional[str]): The status to count users for. Defaults to None (all users).
+        mode (TotalCountEnum): exact recounts once the cached count is older than USER_COUNT_CACHE_TTL_SECONDS,
+            estimate accepts a count of any age, none skips counting.
+
+    Returns:
+        int | None: The number of users, or None when mode is none.
+    """
+    if mode == TotalCountEnum.none:
+        return None
+
+    total = user_counts.get(status, allow_stale=mode == TotalCountEnum.estimate)
+    if total is not None:
+        return total
+
+    if mode == TotalCountEnum.estimate and status is None:
+        # Users are never deleted, so the highest ID is a good estimate that only reads the end of the primary key.
+        return (await execute(db, select(func.max(User.id)))).scalar_one() or 0
+
+    statement = select(func.count()).select_from(User)
+    if status:
+        statement = statement.where(User.status == status)
+    total = (await execute(db, statement)).scalar_one()
+    user_counts.set(status, total)
+    return total
+
+async def get_all_users(db: Session | AsyncSession, offset: int = 0, limit: int = 20, status: Optional[str] = None, cursor: Optional[str] = None,
+                        include_total: TotalCountEnum = TotalCountEnum.exact) -> CursorPaginatedResponse[UserOut]:
     """
     Retrieve a list of users from the database. Can be filtered by status and paginated.
+    Pages are ordered by ID. When a cursor is given, the page starts right after the cursor position
+    using an indexed range scan, and offset is ignored.
     Args:
-        db (Session): The database session.
+        db (Session | AsyncSession): The database session.
         offset (int): The starting point for the query (for pagination).
         limit (int): The maximum number of records to return.
         status (Optional[str]): The status to filter users by (e.g., 'active', 'inactive'). Defaults to None.
+        cursor (Optional[str]): An opaque cursor from a previous page's nextCursor. Defaults to None.
+        include_total (TotalCountEnum): How totalCount is computed, see count_users. Defaults to exact.
 
     Returns:
-        dict: A list of UserOut schemas representing the users and pagination in a dictionary.
+        CursorPaginatedResponse[UserOut]: The page, built without validation. Its data holds plain UserOut dicts ready for responses.dumps.
     """
+    status = status.value if hasattr(status, "value") else status
+    statement = select_user_out()
     if status:
-        data = db.query(User).filter(User.status == status.value if hasattr(status, "value") else status).offset(offset).limit(limit).all()
+        statement = statement.where(User.status == status)
+    if cursor:
+        statement = statement.where(User.id > decode_cursor(cursor))
+        offset = 0
     else:
-        data = db.query(User).offset(offset).limit(limit).all()
-
-    formatted_data = []
-    for user in data:
-        user_dict = UserOut.model_validate(user).model_dump()
-        user_dict['completeName'] = f"{user.firstName} {user.middleName or ''} {user.lastName}".strip()
-        formatted_data.append(user_dict)
+        statement = statement.offset(offset)
+    data = (await execute(db, statement.order_by(User.id).limit(limit))).all()
 
-    return PaginatedResponse(
-        data=formatted_data if formatted_data else [],
-        totalCount=db.query(User).count(),
+    return CursorPaginatedResponse[UserOut].model_construct(
+        data=[user_out_dict(user) for user in data],
+        totalCount=await count_users(db, status=status, mode=include_total),
         limit=limit,
-        offset=offset
+        offset=offset,
+        nextCursor=encode_cursor(data[-1].id) if len(data) == limit else None
     )
 
-def get_user_by_id(db: Session, user_id: int) -> UserOut | None:
+async def get_user_by_id(db: Session | AsyncSession, user_id: int) -> dict | None:
     """
     Retrieve a user by their ID.
     Args:
-        db (Session): The database session.
+        db (Session | AsyncSession): The database session.
         user_id (int): The ID of the user to retrieve.
 
     Returns:
-        UserOut | None: A UserOut schema representing the user, or None if not found.
+        dict | None: The user's UserOut fields, or None if not found.
     """
-    return db.query(User).filter(User.id == user_id).first()
+    row = (await execute(db, select_user_out().where(User.id == user_id))).first()
+    return user_out_dict(row) if row else None
+
+async def get_users_by_ids(db: Session | AsyncSession, user_ids: List[int]) -> UserBatchResponse:
+    """
+    Retrieve many users by ID with a single IN query.
+    Args:
+        db (Session | AsyncSession): The database session.
+        user_ids (List[int]): The IDs to look up. Repeated IDs are returned once.
+
+    Returns:
+        UserBatchResponse: The found users in request order and the IDs that do not exist, built without validation.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    rows = (await execute(db, select_user_out().where(User.id.in_(user_ids)))).all() if user_ids else []
+    found = {row.id: row for row in rows}
+    return UserBatchResponse.model_construct(
+        data=[user_out_dict(found[user_id]) for user_id in user_ids if user_id in found],
+        missing=[user_id for user_id in user_ids if user_id not in found]
+    )
+
+def user_etag(user_id: int, updated_at: Optional[datetime], created_at: Optional[datetime]) -> str:
+    """
+    Build the weak ETag of a user from its ID and last modification time.
+    Args:
+        user_id (int): The ID of the user.
+        updated_at (Optional[datetime]): When the user was last updated, None if never.
+        created_at (Optional[datetime]): When the user was created, used when updated_at is None.
+
+    Returns:
+        str: The ETag header value.
+    """
+    version = updated_at or created_at
+    digest = hashlib.blake2b(f"{user_id}:{version.isoformat() if version else ''}".encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+def page_etag(page: CursorPaginatedResponse[UserOut]) -> str:
+    """
+    Build the weak ETag of a GET /users page from the versions of its users and its paging fields, without serializing it.
+    Args:
+        page (CursorPaginatedResponse[UserOut]): A page returned by get_all_users.
+
+    Returns:
+        str: The ETag header value.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"{page.totalCount}:{page.offset}:{page.limit}:{page.nextCursor}".encode())
+    for user in page.data:
+        version = user["updated_at"] or user["created_at"]
+        digest.update(f"|{user['id']}:{version.isoformat() if version else ''}".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+async def get_user_etag(db: Session | AsyncSession, user_id: int) -> str | None:
+    """
+    Look up the current ETag of a user without loading or serializing the profile.
+    A cached payload answers without a query, otherwise only the timestamp columns are read by primary key.
+    Args:
+        db (Session | AsyncSession): The database session.
+        user_id (int): The ID of the user.
+
+    Returns:
+        str | None: The ETag, or None if the user does not exist.
+    """
+    cached = user_cache.get(f"user:{user_id}")
+    if cached is not None:
+        return cached.split(b"\n", 1)[0].decode()
+    row = (await execute(db, select(User.updated_at, User.created_at).where(User.id == user_id))).first()
+    return user_etag(user_id, row.updated_at, row.created_at) if row else None
+
+async def get_user_payload(db: Session | AsyncSession, user_id: int) -> tuple[str, bytes] | None:
+    """
+    Retrieve a user's serialized UserOut and its ETag, served from user_cache when possible.
+    Cache entries hold the ETag and the JSON separated by a newline (compact JSON never contains one).
+    Args:
+        db (Session | AsyncSession): The database session.
+        user_id (int): The ID of the user to retrieve.
+
+    Returns:
+        tuple[str, bytes] | None: The ETag and the user as JSON, or None if not found.
+    """
+    key = f"user:{user_id}"
+    cached = user_cache.get(key)
+    if cached is not None:
+        etag, payload = cached.split(b"\n", 1)
+        return etag.decode(), payload
+
+    epoch = _user_cache_epoch
+    user = await get_user_by_id(db, user_id)
+    if user is None:
+        return None
+    etag = user_etag(user_id, user["updated_at"], user["created_at"])
+    payload = dumps(user)
+    # A write that committed while the row was being read may have invalidated it already, so the stale copy is not cached
+    if epoch == _user_cache_epoch:
+        user_cache.set(key, etag.encode() + b"\n" + payload)
+    return etag, payload
+
+def invalidate_user_cache(*user_ids: int) -> None:
+    """
+    Drop cached payloads of the given users after they were written.
+    Args:
+        *user_ids (int): The IDs of the changed users.
+    """
+    global _user_cache_epoch
+    _user_cache_epoch += 1
+    for user_id in user_ids:
+        user_cache.delete(f"user:{user_id}")
 
 def generate_complete_name(first_name: str, middle_name: Optional[str], last_name: str) -> str:
     """
@@ -60,67 +247,186 @@ def generate_complete_name(first_name: str, middle_name: Optional[str], last_nam
     """
     return f"{first_name} {middle_name or ''} {last_name}".strip()
 
-def create_user(db: Session, user_data: UserCreate) -> None:
+def duplicate_error_message(error: IntegrityError) -> str:
     """
-    Create a new user in the database.
+    Map a unique constraint violation on registration to the message the API returns.
     Args:
-        db (Session): The database session.
-        user_data (UserOut): The data for the user to be created.
+        error (IntegrityError): The error raised when the user or credential row was flushed.
 
     Returns:
-        None: This function does not return anything. It commits the new user to the database.
+        str: "Email already exists" or "Username already exists".
     """
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
-    existing_username = db.query(Credential).filter(Credential.username == user_data.username).first()
-    if existing_email:
-        raise ValueError("Email already exists")
-    if existing_username:
-        raise ValueError("Username already exists")
+    column = _violated_column(error)
+    if column == "credentials.username":
+        return "Username already exists"
+    if column == "users.email":
+        return "Email already exists"
+    raise error
 
-    username = user_data.username
-    plain_password = user_data.plain_password
-    hashed_password = get_password_hash(plain_password)
-    
-    user_dict = user = user_data.model_dump(exclude={"username", "plain_password"})
+# Unique indexes as named by the initial migration and by Base.metadata.create_all
+_UNIQUE_CONSTRAINT_COLUMNS = {
+    "ix_users_email": "users.email",
+    "ix_credentials_username": "credentials.username",
+}
+
+def _violated_column(error: IntegrityError) -> str | None:
+    # Only the constraint or column name is inspected: the full message also contains the offending value
+    orig = error.orig
+    diag = getattr(orig, "diag", None)  # psycopg2
+    constraint = getattr(diag, "constraint_name", None) or getattr(orig.__cause__, "constraint_name", None)  # asyncpg
+    if constraint:
+        return _UNIQUE_CONSTRAINT_COLUMNS.get(constraint)
+    # SQLite: "UNIQUE constraint failed: users.email"
+    message = str(orig)
+    if message.startswith("UNIQUE constraint failed: "):
+        columns = message.removeprefix("UNIQUE constraint failed: ").split(", ")
+        return next((column for column in columns if column in _UNIQUE_CONSTRAINT_COLUMNS.values()), None)
+    return None
+
+def build_user(user_data: UserCreate, hashed_password: str) -> User:
+    """
+    Build a User with its Credential attached, ready to be added to a session.
+    Args:
+        user_data (UserCreate): The data for the user to be created.
+        hashed_password (str): The bcrypt hash of user_data.plain_password.
+
+    Returns:
+        User: The new user. Flushing it inserts the credential in the same transaction.
+    """
+    user_dict = user_data.model_dump(exclude={"username", "plain_password"})
     user_dict["completeName"] = generate_complete_name(
         first_name=user_data.firstName,
         middle_name=user_data.middleName or None,
         last_name=user_data.lastName
     )
     user = User(**user_dict)
+    user.credential = Credential(username=user_data.username, hashed_password=hashed_password)
+    return user
+
+async def create_user(db: Session | AsyncSession, user_data: UserCreate) -> None:
+    """
+    Create a new user and its credential in one transaction.
+    Duplicates are detected by the unique constraints on email and username rather than by querying first.
+    Args:
+        db (Session | AsyncSession): The database session.
+        user_data (UserCreate): The data for the user to be created.
+
+    Returns:
+        None: This function does not return anything. It commits the new user to the database.
+    """
+    user = build_user(user_data, await get_password_hash_async(user_data.plain_password))
     try:
         db.add(user)
-        db.commit()
-    except Exception:
-        db.rollback()
-        raise
-    db.refresh(user)
-    
-    credential = Credential(
-        user_id=user.id,
-        username=username,
-        hashed_password=hashed_password
-    )
-    try:
-        db.add(credential)
-        db.commit()
+        await flush(db)
+        user_id = user.id
+        await commit(db)
+    except IntegrityError as e:
+        await rollback(db)
+        raise ValueError(duplicate_error_message(e))
     except Exception:
-        db.rollback()
+        await rollback(db)
         raise
-    db.refresh(credential)
 
-def update_user(db: Session, user_id: int, user_data: UserUpdate) -> UserOut:
+    invalidate_user_cache(user_id)
+    # Registration always creates active users
+    user_counts.increment(None)
+    user_counts.increment(StatusEnum.active.value)
+
+async def create_users(db: Session | AsyncSession, users: List[UserCreate], batch_size: int = 500,
+                       hasher: PasswordHasher = password_hasher) -> BulkRegisterResponse:
+    """
+    Create many users, committing one batch of rows per transaction.
+    Passwords of a batch are hashed concurrently on the hasher's workers. Each batch is probed once for
+    existing emails and usernames, and rows that would violate a unique constraint are reported instead of inserted.
+    Args:
+        db (Session | AsyncSession): The database session.
+        users (List[UserCreate]): The users to create.
+        batch_size (int): The maximum number of users inserted per transaction. Defaults to 500.
+        hasher (PasswordHasher): The pool passwords are hashed on. Defaults to the application's password_hasher.
+
+    Returns:
+        BulkRegisterResponse: The number of users created and the rejected rows by index.
+    """
+    created = 0
+    errors: List[BulkRegisterError] = []
+    for start in range(0, len(users), batch_size):
+        batch = list(enumerate(users[start:start + batch_size], start=start))
+        accepted = await _reject_duplicates(db, batch, errors)
+
+        hashed_passwords = []
+        for chunk_start in range(0, len(accepted), hasher.max_workers):
+            chunk = accepted[chunk_start:chunk_start + hasher.max_workers]
+            hashed_passwords += await asyncio.gather(*(hasher.hash(user_data.plain_password) for _, user_data in chunk))
+
+        new_users = [build_user(user_data, hashed) for (_, user_data), hashed in zip(accepted, hashed_passwords)]
+        try:
+            db.add_all(new_users)
+            await flush(db)
+            new_ids = [user.id for user in new_users]
+            await commit(db)
+        except IntegrityError:
+            # Lost a race with another registration, insert the batch row by row to find the offending rows
+            await rollback(db)
+            new_ids = await _insert_one_by_one(db, accepted, hashed_passwords, errors)
+        except Exception:
+            await rollback(db)
+            raise
+
+        created += len(new_ids)
+        invalidate_user_cache(*new_ids)
+        user_counts.increment(None, len(new_ids))
+        user_counts.increment(StatusEnum.active.value, len(new_ids))
+
+    errors.sort(key=lambda error: error.index)
+    return BulkRegisterResponse(created=created, errors=errors)
+
+async def _reject_duplicates(db: Session | AsyncSession, batch: list[tuple[int, UserCreate]], errors: List[BulkRegisterError]) -> list[tuple[int, UserCreate]]:
+    emails = {user_data.email for _, user_data in batch}
+    usernames = {user_data.username for _, user_data in batch}
+    taken_emails = set((await execute(db, select(User.email).where(User.email.in_(emails)))).scalars())
+    taken_usernames = set((await execute(db, select(Credential.username).where(Credential.username.in_(usernames)))).scalars())
+
+    accepted = []
+    for index, user_data in batch:
+        if user_data.username in taken_usernames:
+            errors.append(BulkRegisterError(index=index, username=user_data.username, detail="Username already exists"))
+        elif user_data.email in taken_emails:
+            errors.append(BulkRegisterError(index=index, username=user_data.username, detail="Email already exists"))
+        else:
+            accepted.append((index, user_data))
+            taken_usernames.add(user_data.username)
+            taken_emails.add(user_data.email)
+    return accepted
+
+async def _insert_one_by_one(db: Session | AsyncSession, accepted: list[tuple[int, UserCreate]], hashed_passwords: list[str],
+                             errors: List[BulkRegisterError]) -> list[int]:
+    inserted = []
+    for (index, user_data), hashed in zip(accepted, hashed_passwords):
+        user = build_user(user_data, hashed)
+        try:
+            db.add(user)
+            await flush(db)
+            user_id = user.id
+            await commit(db)
+        except IntegrityError as e:
+            await rollback(db)
+            errors.append(BulkRegisterError(index=index, username=user_data.username, detail=duplicate_error_message(e)))
+            continue
+        inserted.append(user_id)
+    return inserted
+
+async def update_user(db: Session | AsyncSession, user_id: int, user_data: UserUpdate) -> UserOut:
     """
     Update an existing user in the database.
     Args:
-        db (Session): The database session.
+        db (Session | AsyncSession): The database session.
         user_id (int): The ID of the user to update.
         user_data (UserUpdate): The new data for the user.
 
     Returns:
         UserOut: A UserOut schema representing the updated user.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await execute(db, select(User).where(User.id == user_id))).scalars().first()
     if not user:
         raise ValueError("User not found")
 
@@ -136,19 +442,21 @@ def update_user(db: Session, user_id: int, user_data: UserUpdate) -> UserOut:
         )
 
     try:
-        db.commit()
+        await commit(db)
     except Exception:
-        db.rollback()
+        await rollback(db)
         raise
-    db.refresh(user)
+    await refresh(db, user)
+    principal_cache.invalidate_user(user_id)
+    invalidate_user_cache(user_id)
 
     return UserOut.model_validate(user).model_dump()
 
-def change_password(db: Session, user_id: int, current_password: str, new_password: str) -> None:
+async def change_password(db: Session | AsyncSession, user_id: int, current_password: str, new_password: str) -> None:
     """
     Change the password for a user.
     Args:
-        db (Session): The database session.
+        db (Session | AsyncSession): The database session.
         user_id (int): The ID of the user whose password is to be changed.
         current_password (str): The current password of the user to verify.
         new_password (str): The new password to set.
@@ -156,21 +464,22 @@ def change_password(db: Session, user_id: int, current_password: str, new_passwo
     Returns:
         None: This function does not return anything. It commits the new password to the database.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await execute(db, select(User.id).where(User.id == user_id))).first()
     if not user:
         raise ValueError("User not found")
-    print(get_password_hash(current_password))
-    credential = db.query(Credential).filter(Credential.user_id == user_id).first()
-    if not verify_password(current_password, credential.hashed_password):
+    credential = (await execute(db, select(Credential).where(Credential.user_id == user_id))).scalars().first()
+    if not await verify_password_async(current_password, credential.hashed_password):
         raise ValueError("Credential not found")
 
-    credential.hashed_password = get_password_hash(new_password)
+    credential.hashed_password = await get_password_hash_async(new_password)
     credential.updated_at = datetime.now(timezone.utc)
     
     try:
-        db.commit()
+        await commit(db)
     except Exception:
-        db.rollback()
+        await rollback(db)
         raise
-    db.refresh(credential)
+    await refresh(db, credential)
+    principal_cache.invalidate_user(user_id)
+    invalidate_user_cache(user_id)
 
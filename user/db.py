@@ -1,17 +1,139 @@
-from sqlalchemy import create_engine
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator
+from . import config
 
-DATABASE_URL = "sqlite:///./user_management.db"
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def to_async_url(url: str) -> str:
+    """Swap the driver of a database URL for its asyncio counterpart, e.g. sqlite -> sqlite+aiosqlite."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases, set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def engine_options(url: str) -> dict:
+    """Keyword arguments for create_engine/create_async_engine. Server databases get the DB_POOL_* pool settings."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": config.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+DATABASE_URL = config.DATABASE_URL
+ASYNC_DATABASE_URL = config.ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+
+def apply_sqlite_pragmas(dbapi_connection, read_only: bool = False) -> None:
+    """Apply the SQLITE_* connection profile from config to a new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size={config.SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA temp_store={config.SQLITE_TEMP_STORE}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+def configure_sqlite_engine(engine: Engine, read_only: bool = False) -> None:
+    """Apply the SQLite connection profile to every connection the engine opens. Engines for other databases are left alone."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+configure_sqlite_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+configure_sqlite_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Separate SQLite pools whose connections refuse writes, used by the GET routes when SQLITE_READ_ONLY_POOL is enabled
+read_engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+configure_sqlite_engine(read_engine, read_only=True)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+async_read_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+configure_sqlite_engine(async_read_engine.sync_engine, read_only=True)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[Session | AsyncSession, None]:
+    """Yield an AsyncSession when USE_ASYNC_DB is enabled, otherwise a blocking Session."""
+    if config.USE_ASYNC_DB:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+async def get_read_db(db: Session | AsyncSession = Depends(get_db)) -> AsyncGenerator[Session | AsyncSession, None]:
+    """
+    Yield a session for read-only routes.
+    With SQLITE_READ_ONLY_POOL enabled it comes from the read-only pool, otherwise the request's get_db session is reused
+    (sessions connect lazily, so the unused one costs nothing).
+    """
+    if not config.SQLITE_READ_ONLY_POOL:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+    elif config.USE_ASYNC_DB:
+        async with AsyncReadSessionLocal() as read_db:
+            yield read_db
+    else:
+        read_db = ReadSessionLocal()
+        try:
+            yield read_db
+        finally:
+            read_db.close()
+
+async def execute(db: Session | AsyncSession, statement):
+    """Execute a statement on either a sync or an async session."""
+    if isinstance(db, AsyncSession):
+        return await db.execute(statement)
+    return db.execute(statement)
+
+async def flush(db: Session | AsyncSession) -> None:
+    """Flush pending changes on either a sync or an async session."""
+    if isinstance(db, AsyncSession):
+        await db.flush()
+    else:
+        db.flush()
+
+async def commit(db: Session | AsyncSession) -> None:
+    """Commit the current transaction on either a sync or an async session."""
+    if isinstance(db, AsyncSession):
+        await db.commit()
+    else:
+        db.commit()
+
+async def rollback(db: Session | AsyncSession) -> None:
+    """Roll back the current transaction on either a sync or an async session."""
+    if isinstance(db, AsyncSession):
+        await db.rollback()
+    else:
+        db.rollback()
+
+async def refresh(db: Session | AsyncSession, instance) -> None:
+    """Reload an instance's attributes on either a sync or an async session."""
+    if isinstance(db, AsyncSession):
+        await db.refresh(instance)
+    else:
+        db.refresh(instance)
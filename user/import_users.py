@@ -0,0 +1,77 @@
+"""
+Import users from a CSV or JSON Lines file.
+
+    python -m user.import_users users.csv [--batch-size 500] [--workers 4] [--pool process]
+
+CSV files need a header row with the UserCreate fields (email, mobile, firstName, middleName, lastName, role,
+username, plain_password). JSON Lines files hold one UserCreate object per line. Rows are inserted in batches
+of --batch-size per transaction while their passwords are hashed on --workers bcrypt workers.
+Invalid or duplicate rows are reported by their line number and skipped.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Iterator
+from pydantic import ValidationError
+from .auth.hashing import PasswordHasher
+from .crud import create_users
+from .db import SessionLocal
+from .schemas import UserCreate
+from . import config
+
+def read_rows(path: Path) -> Iterator[tuple[int, dict]]:
+    """Yield (line number, row) pairs from a .csv or .jsonl file."""
+    with path.open(newline="", encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {key: value or None for key, value in row.items()}
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+
+def parse_users(path: Path) -> tuple[list[UserCreate], list[int], list[str]]:
+    """Validate every row. Returns the valid users, their line numbers and the errors of the invalid rows."""
+    users, lines, errors = [], [], []
+    for line_number, row in read_rows(path):
+        try:
+            users.append(UserCreate.model_validate(row))
+            lines.append(line_number)
+        except ValidationError as e:
+            error = e.errors()[0]
+            errors.append(f"line {line_number}: {'.'.join(map(str, error['loc']))}: {error['msg']}")
+    return users, lines, errors
+
+async def import_users(path: Path, batch_size: int, hasher: PasswordHasher) -> int:
+    users, lines, errors = parse_users(path)
+    db = SessionLocal()
+    try:
+        result = await create_users(db, users, batch_size=batch_size, hasher=hasher)
+    finally:
+        db.close()
+        hasher.shutdown()
+
+    errors += [f"line {lines[error.index]}: {error.username}: {error.detail}" for error in result.errors]
+    for error in errors:
+        print(error, file=sys.stderr)
+    print(f"Imported {result.created} users, skipped {len(errors)} rows")
+    return 1 if errors else 0
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Import users from a CSV or JSON Lines file.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--batch-size", type=int, default=config.BULK_REGISTER_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="bcrypt workers")
+    parser.add_argument("--pool", choices=("thread", "process"), default="process", help="bcrypt worker pool")
+    args = parser.parse_args(argv)
+
+    hasher = PasswordHasher(args.pool, max_workers=args.workers, queue_depth=0)
+    return asyncio.run(import_users(args.path, args.batch_size, hasher))
+
+if __name__ == "__main__":
+    sys.exit(main())
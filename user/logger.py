@@ -1,18 +1,130 @@
+import atexit
+import itertools
+import json
 import logging
+import queue
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .models import ActionLog
+from .db import commit
+from .audit import audit_writer
+from .metrics import record_audit
+from . import config
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-    handlers=[
-        logging.FileHandler("user_actions.log")
-    ]
-)
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+# Attributes every LogRecord has. Anything else was passed through extra= and is added to the JSON object.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line with the time, level, logger, message and any extra= fields."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the INFO and DEBUG records of chosen loggers. Warnings and errors always pass.
+    Args:
+        rates (dict[str, float]): Sample rate by logger name. A logger uses the rate of its closest configured parent.
+            0.01 keeps every 100th record, 0 drops them all.
+    """
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._counters: dict[str, tuple[int, itertools.count]] = {}
+        self.dropped = 0
+
+    def _counter(self, name: str) -> tuple[int, itertools.count]:
+        counter = self._counters.get(name)
+        if counter is None:
+            parent = name
+            while parent and parent not in self.rates:
+                parent = parent.rpartition(".")[0]
+            rate = self.rates.get(parent, 1.0)
+            every = 0 if rate <= 0 else max(1, round(1 / rate))
+            counter = self._counters.setdefault(name, (every, itertools.count()))
+        return counter
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        every, count = self._counter(record.name)
+        if every and next(count) % every == 0:
+            return True
+        self.dropped += 1
+        return False
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """Parse LOG_SAMPLE_RATES, e.g. "user.auth.token_utils=0.01,user-management=0.5"."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+_listener: QueueListener | None = None
+
+def configure_logging() -> None:
+    """
+    Route every log record through a QueueHandler so callers only pay for putting it on a queue.
+    A QueueListener thread formats the records and writes them to the rotating LOG_FILE.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    file_handler = RotatingFileHandler(config.LOG_FILE, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT)
+    file_handler.setFormatter(JsonFormatter() if config.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    queue_handler = QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(config.LOG_SAMPLE_RATES)))
+    root = logging.getLogger()
+    root.setLevel(config.LOG_LEVEL)
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging() -> None:
+    """Write out the queued records and stop the listener thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+configure_logging()
 
 logger = logging.getLogger("user-management")
 
-def log_action(db: Session, action: str, status: str = "success", ip: str | None = None, user_id: int | None = None, username: str | None = None):
-    log = ActionLog(user_id=user_id, username=username, action=action, status=status, ip_address=ip)
-    db.add(log)
-    db.commit()
+async def log_action(db: Session | AsyncSession, action: str, status: str = "success", ip: str | None = None, user_id: int | None = None, username: str | None = None):
+    """Record an audit event. Goes through the batched audit writer when it is running, otherwise it is committed on db."""
+    start = time.perf_counter()
+    try:
+        if audit_writer.running:
+            await audit_writer.enqueue({
+                "user_id": user_id,
+                "username": username,
+                "action": action,
+                "status": status,
+                "ip_address": ip,
+                "timestamp": datetime.now(timezone.utc),
+            })
+            return
+        log = ActionLog(user_id=user_id, username=username, action=action, status=status, ip_address=ip)
+        db.add(log)
+        await commit(db)
+    finally:
+        record_audit(time.perf_counter() - start)
@@ -1,14 +1,69 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from .routes import router
 from .auth.auth import token_router
+from .auth.hashing import password_hasher
+from .audit import audit_writer
+from .maintenance import retention_sweeper
+from .auth.principal_cache import principal_cache
+from .auth.keys import key_ring
+from .auth.introspection import token_introspector
+from .auth.token_utils import token_denylist
+from .auth.rate_limit import login_throttle
+from .crud import user_cache, user_counts
+from .db import engine, async_engine, read_engine, async_read_engine
+from .responses import json_response
+from .metrics import MetricsMiddleware, instrument_engine, registry
+from . import config
 
-app = FastAPI(title="User Management API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.AUDIT_LOG_BATCHING:
+        audit_writer.start()
+    if config.RETENTION_SWEEP_ENABLED:
+        retention_sweeper.start()
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(retention_sweeper.stop)
+        await asyncio.to_thread(audit_writer.stop)
+        password_hasher.shutdown()
+        # aiosqlite runs each connection on a non-daemon thread, which would keep the process alive
+        await async_engine.dispose()
+        await async_read_engine.dispose()
+
+app = FastAPI(title="User Management API", version="1.0.0", lifespan=lifespan)
 
 @app.get("/", include_in_schema=False)
 async def read_root():
     return RedirectResponse(url="/docs")
 
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks():
+    # Consumers verify tokens locally against these keys; a rotated-in key appears here before it signs anything
+    # as long as it is deployed at least max-age before being made active
+    return json_response(key_ring.jwks(), headers={"Cache-Control": f"public, max-age={config.JWKS_MAX_AGE_SECONDS}"})
+
 app.include_router(token_router, prefix="/auth", tags=["authentication"])
 app.include_router(router, prefix="/users", tags=["users"])
 
+if config.METRICS_ENABLED:
+    for instrumented in (engine, async_engine.sync_engine, read_engine, async_read_engine.sync_engine):
+        instrument_engine(instrumented)
+    registry.register_stats("password_hasher", password_hasher.stats)
+    registry.register_stats("audit_writer", audit_writer.stats)
+    registry.register_stats("retention_sweeper", retention_sweeper.stats)
+    registry.register_stats("principal_cache", principal_cache.stats)
+    registry.register_stats("token_introspection", token_introspector.stats)
+    registry.register_stats("token_denylist", token_denylist.stats)
+    registry.register_stats("login_throttle", login_throttle.stats)
+    registry.register_stats("user_cache", user_cache.stats)
+    registry.register_stats("user_count_cache", user_counts.stats)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, or_, select, text
+from sqlalchemy.engine import Engine
+from .models import ActionLog, RefreshToken
+from .db import engine
+from . import config
+
+logger = logging.getLogger("user-management")
+
+class RetentionSweeper:
+    """
+    Background sweeper that purges expired or revoked refresh tokens and audit rows past their retention.
+    Rows are deleted in short transactions of at most batch_size rows with a pause in between,
+    so a sweep never holds the write lock for long.
+    Args:
+        engine (Engine): The engine rows are deleted with.
+        interval (float): Seconds between sweeps.
+        batch_size (int): The maximum number of rows deleted per transaction.
+        batch_pause (float): Seconds to sleep between batches so other writers can get the lock.
+        action_log_retention_days (float): How long audit rows are kept. 0 keeps them forever.
+        vacuum_pages (int): Free pages returned to the OS with PRAGMA incremental_vacuum after a sweep (SQLite only). 0 disables it.
+    """
+    def __init__(self, engine: Engine, interval: float = 3600, batch_size: int = 500, batch_pause: float = 0.05,
+                 action_log_retention_days: float = 90, vacuum_pages: int = 0):
+        self.engine = engine
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.action_log_retention_days = action_log_retention_days
+        self.vacuum_pages = vacuum_pages
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.sweeps = 0
+        self.failed_sweeps = 0
+        self.refresh_tokens_purged = 0
+        self.action_logs_purged = 0
+        self.last_sweep: dict = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Start sweeping in a background thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread, letting a running batch finish first."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                self.failed_sweeps += 1
+                logger.error("Retention sweep failed: %s", e)
+
+    def sweep(self, now: datetime | None = None) -> dict:
+        """Run one sweep and return the number of rows purged per table."""
+        now = now or datetime.now(timezone.utc)
+        start = time.perf_counter()
+
+        refresh_tokens = self._purge(RefreshToken, or_(RefreshToken.expires_at < now, RefreshToken.revoked.is_(True)))
+        action_logs = 0
+        if self.action_log_retention_days > 0:
+            cutoff = now - timedelta(days=self.action_log_retention_days)
+            action_logs = self._purge(ActionLog, ActionLog.timestamp < cutoff)
+        if self.vacuum_pages > 0 and self.engine.dialect.name == "sqlite":
+            with self.engine.begin() as conn:
+                conn.execute(text(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})"))
+
+        self.sweeps += 1
+        self.refresh_tokens_purged += refresh_tokens
+        self.action_logs_purged += action_logs
+        self.last_sweep = {
+            "refresh_tokens": refresh_tokens,
+            "action_logs": action_logs,
+            "seconds": time.perf_counter() - start,
+        }
+        if refresh_tokens or action_logs:
+            logger.info("Retention sweep purged %s refresh tokens and %s audit rows", refresh_tokens, action_logs)
+        return self.last_sweep
+
+    def _purge(self, model, condition) -> int:
+        # DELETE ... LIMIT is not portable, so each batch deletes the ids picked by a limited subquery
+        purged = 0
+        while not self._stop.is_set():
+            batch = select(model.id).where(condition).limit(self.batch_size).scalar_subquery()
+            with self.engine.begin() as conn:
+                deleted = conn.execute(delete(model).where(model.id.in_(batch))).rowcount
+            purged += deleted
+            if deleted < self.batch_size:
+                break
+            if self.batch_pause > 0:
+                time.sleep(self.batch_pause)
+        return purged
+
+    def stats(self) -> dict:
+        """Return sweep counts, rows purged in total and by the last sweep."""
+        return {
+            "running": self.running,
+            "sweeps": self.sweeps,
+            "failed_sweeps": self.failed_sweeps,
+            "refresh_tokens_purged": self.refresh_tokens_purged,
+            "action_logs_purged": self.action_logs_purged,
+            "last_sweep": self.last_sweep,
+        }
+
+retention_sweeper = RetentionSweeper(
+    engine,
+    interval=config.RETENTION_SWEEP_INTERVAL_SECONDS,
+    batch_size=config.RETENTION_SWEEP_BATCH_SIZE,
+    batch_pause=config.RETENTION_SWEEP_BATCH_PAUSE_SECONDS,
+    action_log_retention_days=config.ACTION_LOG_RETENTION_DAYS,
+    vacuum_pages=config.SQLITE_INCREMENTAL_VACUUM_PAGES
+)
@@ -0,0 +1,247 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    A monotonically increasing value per label set.
+    Args:
+        name (str): The metric name.
+        documentation (str): The HELP text.
+        labelnames (tuple[str, ...]): The label names, values are passed positionally to inc().
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values]
+
+class Gauge(Counter):
+    """A value per label set that can go up and down."""
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+class Histogram:
+    """
+    Observations counted into fixed cumulative buckets per label set, plus their sum and count.
+    Args:
+        name (str): The metric name.
+        documentation (str): The HELP text.
+        labelnames (tuple[str, ...]): The label names, values are passed positionally to observe().
+        buckets (tuple[float, ...]): The sorted upper bounds. +Inf is implied.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per label set: one count per bucket and +Inf (not cumulative until rendered), then the sum
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def count(self, labels: tuple = ()) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[:-1]) if entry else 0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = [(labels, list(entry)) for labels, entry in self._values.items()]
+        lines = []
+        for labels, entry in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), entry):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{float(bound)!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(entry[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Holds metrics and stats() callbacks and renders them in the Prometheus text exposition format."""
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._stats: list[tuple[str, Callable[[], dict]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix: str, stats: Callable[[], dict]) -> None:
+        """Export every numeric value of a component's stats() dict as a gauge named <prefix>_<key>."""
+        self._stats.append((prefix, stats))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for prefix, stats in self._stats:
+            for key, value in _flatten(stats()):
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+def _flatten(stats: dict, prefix: str = ""):
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}_")
+        elif isinstance(value, (bool, int, float)):
+            yield f"{prefix}{key}", int(value) if isinstance(value, bool) else value
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")))
+http_request_duration = registry.register(Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route")))
+http_requests_in_flight = registry.register(Gauge("http_requests_in_flight", "HTTP requests being served."))
+http_request_db_queries = registry.register(Histogram("http_request_db_queries", "Database queries per HTTP request.", ("route",), COUNT_BUCKETS))
+http_request_db_seconds = registry.register(Counter("http_request_db_seconds_total", "Time spent in database queries by HTTP requests.", ("route",)))
+http_request_bcrypt_seconds = registry.register(Counter("http_request_bcrypt_seconds_total", "Time HTTP requests waited on password hashing.", ("route",)))
+http_request_audit_seconds = registry.register(Counter("http_request_audit_seconds_total", "Time HTTP requests spent recording audit events.", ("route",)))
+db_query_duration = registry.register(Histogram("db_query_duration_seconds", "Database query latency, including background writers."))
+db_query_errors = registry.register(Counter("db_query_errors_total", "Database queries that raised, e.g. on a constraint violation."))
+audit_log_duration = registry.register(Histogram("audit_log_duration_seconds", "Latency of log_action calls."))
+
+class RequestStats:
+    """Work attributed to the HTTP request running in the current context."""
+    __slots__ = ("db_queries", "db_seconds", "bcrypt_seconds", "audit_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.bcrypt_seconds = 0.0
+        self.audit_seconds = 0.0
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+def record_bcrypt(seconds: float) -> None:
+    """Attribute time spent waiting on the password hasher to the current request."""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.bcrypt_seconds += seconds
+
+def record_audit(seconds: float) -> None:
+    """Record the latency of a log_action call."""
+    audit_log_duration.observe((), seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.audit_seconds += seconds
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every query the engine runs and attribute it to the current request."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        _record_query(conn.info["query_started"].pop())
+
+    # after_cursor_execute is skipped when a statement raises, so failed queries are popped and counted here
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        started = conn.info.get("query_started") if conn is not None else None
+        if started:
+            db_query_errors.inc()
+            _record_query(started.pop())
+
+def _record_query(started: float) -> None:
+    elapsed = time.perf_counter() - started
+    db_query_duration.observe((), elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records latency, status, in-flight requests and per-request database,
+    bcrypt and audit time by route template. Unmatched paths share one label to bound cardinality.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            _request_stats.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_requests.inc((method, route, status_code))
+            http_request_duration.observe((method, route), elapsed)
+            http_request_db_queries.observe((route,), stats.db_queries)
+            if stats.db_queries:
+                http_request_db_seconds.inc((route,), stats.db_seconds)
+            if stats.bcrypt_seconds:
+                http_request_bcrypt_seconds.inc((route,), stats.bcrypt_seconds)
+            if stats.audit_seconds:
+                http_request_audit_seconds.inc((route,), stats.audit_seconds)
@@ -0,0 +1,28 @@
+from sqlalchemy import Row, Select, select
+from .models import User
+from .schemas import UserOut
+
+USER_OUT_COLUMNS = tuple(getattr(User, field) for field in UserOut.model_fields)
+
+def select_user_out() -> Select:
+    """
+    Build a SELECT of only the columns UserOut needs.
+    The result rows are plain Row tuples (which use __slots__), so no User entity is hydrated,
+    tracked in the session's identity map or given relationship loaders.
+
+    Returns:
+        Select: The statement, ready for further where/order_by/limit clauses.
+    """
+    return select(*USER_OUT_COLUMNS)
+
+def user_out_dict(row: Row) -> dict:
+    """
+    Convert a row from select_user_out into the UserOut shape without running validation.
+    Rows were validated when they were written, so they are serialized straight from the columns.
+    Args:
+        row (Row): A row selected with select_user_out.
+
+    Returns:
+        dict: The user's UserOut fields.
+    """
+    return row._asdict()
@@ -0,0 +1,44 @@
+import json
+from datetime import date, datetime
+from enum import Enum
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, the stdlib encoder produces the same output
+    orjson = None
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        # Shallow on purpose: nested values are already plain data (see crud.user_out_dict).
+        return dict(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    """Encode content as compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+def json_response(content, status_code: int = 200, headers: dict | None = None) -> Response:
+    """Return content as a pre-encoded JSON response, skipping FastAPI's response_model validation and encoding. Bytes are sent as they are."""
+    body = content if isinstance(content, bytes) else dumps(content)
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag using the weak comparison GET requests call for."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def not_modified(etag: str) -> Response:
+    """Return an empty 304 response carrying the ETag."""
+    return Response(status_code=304, headers={"ETag": etag})
@@ -1,82 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from .crud import get_all_users, get_user_by_id, create_user, update_user, change_password
-from .db import get_db
-from .schemas import PaginatedResponse, UserOut, StatusEnum, UserCreate, UserUpdate
+from sqlalchemy.ext.asyncio import AsyncSession
+from .crud import get_all_users, get_user_etag, get_user_payload, get_users_by_ids, page_etag, create_user, create_users, update_user, change_password
+from .db import get_db, get_read_db
+from .schemas import CursorPaginatedResponse, UserOut, StatusEnum, UserCreate, UserUpdate, TotalCountEnum, BulkRegisterResponse, UserBatchRequest, UserBatchResponse
 from .logger import logger, log_action
+from .responses import json_response, etag_matches, not_modified
 from .schemas import ActionLogEnum, ActionLogActionsEnum, CredentialUpdate
 from .auth.auth import get_current_user
-from typing import Optional
+from .auth.principal_cache import Principal
+from typing import List, Optional
+from . import config
 
 router = APIRouter()
 
-@router.get("", response_model=PaginatedResponse, summary="Get all users", description="Retrieve a paginated list of all users.")
+@router.get("", response_model=CursorPaginatedResponse[UserOut], summary="Get all users", description="Retrieve a paginated list of all users.")
 async def get_users(status: Optional[StatusEnum] = Query(None, description="Filter users by status (active/inactive)"), 
                     offset: int = Query(0, ge=0, description="Start index"), limit: int = Query(10, ge=1, description="Maximum number of users to return"), 
-                    db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
-    users = get_all_users(db, offset=offset, limit=limit, status=status)
+                    cursor: Optional[str] = Query(None, description="Cursor from a previous page's nextCursor. When set, offset is ignored"),
+                    include_total: TotalCountEnum = Query(TotalCountEnum.exact, description="true for a cached exact totalCount, estimate for a possibly stale one, false to skip counting"),
+                    if_none_match: Optional[str] = Header(None), db: Session | AsyncSession = Depends(get_read_db),
+                    current_user: Principal = Depends(get_current_user)):
+    try:
+        users = await get_all_users(db, offset=offset, limit=limit, status=status, cursor=cursor, include_total=include_total)
+    except ValueError as e:
+        logger.warning("GET /users - %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
     if not(users.data):
         logger.warning("GET /users - No users found")
         raise HTTPException(status_code=200, detail="No users found")
+    etag = page_etag(users)
+    if etag_matches(if_none_match, etag):
+        logger.info("GET /users - page not modified")
+        return not_modified(etag)
     logger.info("GET /users - retrieving all users successfully")
-    return users
+    return json_response(users, headers={"ETag": etag})
+
+@router.post("/batch", response_model=UserBatchResponse, summary="Get users by IDs", description="Retrieve up to USER_BATCH_MAX_IDS users in request order. Unknown IDs are listed in missing.")
+async def get_users_batch(body: UserBatchRequest, db: Session | AsyncSession = Depends(get_read_db), current_user: Principal = Depends(get_current_user)):
+    if len(body.ids) > config.USER_BATCH_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {config.USER_BATCH_MAX_IDS} IDs can be requested at once")
+    users = await get_users_by_ids(db, body.ids)
+    logger.info("POST /users/batch - found %s of %s users", len(users.data), len(body.ids))
+    return json_response(users)
 
 @router.get("/{user_id}", response_model=UserOut, summary="Get user by ID", description="Retrieve a user by their unique ID.")
-async def get_user(user_id: int, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
-    user = get_user_by_id(db, user_id)
+async def get_user(user_id: int, if_none_match: Optional[str] = Header(None), db: Session | AsyncSession = Depends(get_read_db),
+                   current_user: Principal = Depends(get_current_user)):
+    if if_none_match:
+        etag = await get_user_etag(db, user_id)
+        if etag and etag_matches(if_none_match, etag):
+            logger.info("GET /users/%s - not modified", user_id)
+            return not_modified(etag)
+    user = await get_user_payload(db, user_id)
     if not user:
-        logger.warning(f"GET /users/{user_id} - user not found")
+        logger.warning("GET /users/%s - user not found", user_id)
         raise HTTPException(status_code=404, detail="User not found")
-    logger.info(f"GET /users/{user_id} - get user details successfully")
-    return user
+    etag, payload = user
+    logger.info("GET /users/%s - get user details successfully", user_id)
+    return json_response(payload, headers={"ETag": etag})
 
 @router.post("/register", response_model=None, status_code=status.HTTP_201_CREATED, summary="Register a new user", description="Create a new user with the provided details.")
-async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: Session | AsyncSession = Depends(get_db)):
     try:
-        create_user(db, user_data)
+        await create_user(db, user_data)
     except ValueError as e:
-        logger.error(f"Register failed for username {user_data.username}: {str(e)}")
-        log_action(db, username=user_data.username, action=ActionLogEnum.register_user, status=ActionLogActionsEnum.failed)
+        logger.error("Register failed for username %s: %s", user_data.username, e)
+        await log_action(db, username=user_data.username, action=ActionLogEnum.register_user, status=ActionLogActionsEnum.failed)
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Unexpected error while registering user {user_data.username}: {str(e)}")
-        log_action(db, username=user_data.username, action=ActionLogEnum.register_user, status=ActionLogActionsEnum.failed)
+        logger.error("Unexpected error while registering user %s: %s", user_data.username, e)
+        await log_action(db, username=user_data.username, action=ActionLogEnum.register_user, status=ActionLogActionsEnum.failed)
         raise HTTPException(status_code=500, detail="Internal server error")
     
-    logger.info(f"User created successfully: username={user_data.username}")
-    log_action(db, username=user_data.username, action=ActionLogEnum.register_user, status=ActionLogActionsEnum.success)
+    logger.info("User created successfully: username=%s", user_data.username)
+    await log_action(db, username=user_data.username, action=ActionLogEnum.register_user, status=ActionLogActionsEnum.success)
     return {"message": "User created successfully"}
 
+@router.post("/register/bulk", response_model=BulkRegisterResponse, status_code=status.HTTP_200_OK, summary="Register many users",
+             description="Create up to BULK_REGISTER_MAX_USERS users. Rows whose email or username already exists are reported by index and skipped. "
+                         "Use python -m user.import_users for larger imports.")
+async def register_users(users: List[UserCreate], db: Session | AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    if len(users) > config.BULK_REGISTER_MAX_USERS:
+        raise HTTPException(status_code=413, detail=f"At most {config.BULK_REGISTER_MAX_USERS} users can be registered per request, use python -m user.import_users for larger imports")
+    try:
+        result = await create_users(db, users, batch_size=config.BULK_REGISTER_BATCH_SIZE)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Unexpected error while bulk registering users: %s", e)
+        await log_action(db, user_id=current_user.user_id, username=current_user.username, action=ActionLogEnum.register_user, status=ActionLogActionsEnum.failed)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    logger.info("Bulk registration created %s users, rejected %s", result.created, len(result.errors))
+    await log_action(db, user_id=current_user.user_id, username=current_user.username, action=ActionLogEnum.register_user, status=ActionLogActionsEnum.success)
+    return result
+
 @router.put("/update/{user_id}", response_model=UserOut, status_code=status.HTTP_200_OK, summary="Update user details", description="Update the details of an existing user.")
-async def update_user_by_id(user_id: int, user_data: UserUpdate, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
+async def update_user_by_id(user_id: int, user_data: UserUpdate, db: Session | AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     try:
-        user = update_user(db, user_id, user_data)
+        user = await update_user(db, user_id, user_data)
     except ValueError as e:
-        logger.error(f"Update failed for user ID {user_id}: {str(e)}")
-        log_action(db, user_id=user_id, action=ActionLogEnum.update_user, status=ActionLogActionsEnum.failed)
+        logger.error("Update failed for user ID %s: %s", user_id, e)
+        await log_action(db, user_id=user_id, action=ActionLogEnum.update_user, status=ActionLogActionsEnum.failed)
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Unexpected error while updating user ID {user_id}: {str(e)}")
-        log_action(db, user_id=user_id, action=ActionLogEnum.update_user, status=ActionLogActionsEnum.failed)
+        logger.error("Unexpected error while updating user ID %s: %s", user_id, e)
+        await log_action(db, user_id=user_id, action=ActionLogEnum.update_user, status=ActionLogActionsEnum.failed)
         raise HTTPException(status_code=500, detail="Internal server error")
     
-    logger.info(f"User updated successfully: user_id={user_id}")
-    log_action(db, user_id=user_id, action=ActionLogEnum.update_user, status=ActionLogActionsEnum.success)
+    logger.info("User updated successfully: user_id=%s", user_id)
+    await log_action(db, user_id=user_id, action=ActionLogEnum.update_user, status=ActionLogActionsEnum.success)
     return user
 
 @router.put("/change/password/{user_id}", status_code=status.HTTP_200_OK, summary="Change user password", description="Change the password of an existing user.")
-async def change_user_password(user_id: int, body: CredentialUpdate, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
+async def change_user_password(user_id: int, body: CredentialUpdate, db: Session | AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     try:
-        change_password(db, user_id, body.current_password, body.new_password)
-        logger.info(f"Changed password successfully for user ID: {user_id}")
-        log_action(db, user_id=user_id, action=ActionLogEnum.change_password, status=ActionLogActionsEnum.success)
+        await change_password(db, user_id, body.current_password, body.new_password)
+        logger.info("Changed password successfully for user ID: %s", user_id)
+        await log_action(db, user_id=user_id, action=ActionLogEnum.change_password, status=ActionLogActionsEnum.success)
     except ValueError as e:
-        logger.error(f"Change password failed for user ID {user_id}: {str(e)}")
-        log_action(db, user_id=user_id, action=ActionLogEnum.change_password, status=ActionLogActionsEnum.failed)
+        logger.error("Change password failed for user ID %s: %s", user_id, e)
+        await log_action(db, user_id=user_id, action=ActionLogEnum.change_password, status=ActionLogActionsEnum.failed)
         raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Unexpected error while changing password for user ID {user_id}: {str(e)}")
-        log_action(db, user_id=user_id, action=ActionLogEnum.change_password, status=ActionLogActionsEnum.failed)
+        logger.error("Unexpected error while changing password for user ID %s: %s", user_id, e)
+        await log_action(db, user_id=user_id, action=ActionLogEnum.change_password, status=ActionLogActionsEnum.failed)
         raise HTTPException(status_code=500, detail="Internal server error")
     
     return {"message": "Password changed successfully"}
\ No newline at end of file
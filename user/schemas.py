@@ -1,7 +1,9 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict, validator
 from enum import Enum
 from datetime import datetime
-from typing import Optional, List, Any
+from typing import Optional, List, Generic, TypeVar
+
+T = TypeVar("T")
 
 class StatusEnum(str, Enum):
     active = "active"
@@ -20,6 +22,11 @@ class ActionLogEnum(str, Enum):
     verify_token = "verify_token"
     change_password = "change_password"
 
+class TotalCountEnum(str, Enum):
+    exact = "true"
+    none = "false"
+    estimate = "estimate"
+
 class ActionLogBase(BaseModel):
     user_id: int
     user_name: str
@@ -34,16 +41,19 @@ class ActionLogOut(ActionLogBase):
         from_attributes=True
     )
 
-class PaginatedResponse(BaseModel):
-    totalCount: int
+class PaginatedResponse(BaseModel, Generic[T]):
+    totalCount: Optional[int] = None
     offset: int
     limit: int
-    data: List[Any]
+    data: List[T]
 
     model_config = ConfigDict(
         from_attributes=True
     )
 
+class CursorPaginatedResponse(PaginatedResponse[T], Generic[T]):
+    nextCursor: Optional[str] = None
+
 class UserBase(BaseModel):
     email: EmailStr
     mobile: str = Field(..., min_length=10, max_length=11)
@@ -62,6 +72,24 @@ class UserOut(UserBase):
         from_attributes=True
     )
 
+class UserBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+class UserBatchResponse(BaseModel):
+    data: List[UserOut]
+    missing: List[int] = []
+
+class TokenIntrospectRequest(BaseModel):
+    tokens: List[str] = Field(..., min_length=1)
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    sub: Optional[int] = None
+    exp: Optional[int] = None
+
+class TokenIntrospectResponse(BaseModel):
+    data: List[TokenIntrospection]
+
 class UserCreate(UserBase):
     username: str
     plain_password: str
@@ -71,6 +99,15 @@ class UserCreate(UserBase):
         from_attributes=True
     )
 
+class BulkRegisterError(BaseModel):
+    index: int
+    username: str
+    detail: str
+
+class BulkRegisterResponse(BaseModel):
+    created: int
+    errors: List[BulkRegisterError] = []
+
 class UserUpdate(UserBase):
     firstName: Optional[str] = None
     middleName: Optional[str] = None
@@ -4,12 +4,23 @@ from ..main import app
 from .test_db import setup_test_db, teardown_test_db, TestingSessionLocal
 from ..models import User, Credential, RefreshToken
 from ..auth.auth import get_password_hash, save_refresh_token
+from ..auth.principal_cache import principal_cache
+from ..auth.introspection import token_introspector
+from ..auth.token_utils import token_denylist
+from ..auth.rate_limit import login_throttle
+from ..crud import user_counts, user_cache
 from datetime import datetime, timezone
 import uuid
 from fastapi import Request
 
 @pytest.fixture(scope="function", autouse=True)
 def setup_and_teardown_db():
+    principal_cache.clear()
+    token_introspector.clear()
+    token_denylist.clear()
+    login_throttle.clear()
+    user_counts.clear()
+    user_cache.clear()
     setup_test_db()
     yield
     teardown_test_db()
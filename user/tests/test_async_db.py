@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, StaticPool
+from ..db import Base, get_db, to_async_url
+from ..main import app
+from ..models import ActionLog, RefreshToken
+from ..auth.token_utils import hash_token
+from .test_db import TEST_DATABASE_URL, override_get_db
+
+ASYNC_TEST_DATABASE_URL = to_async_url(TEST_DATABASE_URL)
+
+@asynccontextmanager
+async def async_sessions(url: str):
+    """Serve the app from async sessions on a freshly created database at url."""
+    in_memory_sqlite = make_url(url).get_backend_name() == "sqlite" and make_url(url).database in (None, "", ":memory:")
+    engine = create_async_engine(url, poolclass=StaticPool if in_memory_sqlite else NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_async_db
+    try:
+        yield factory
+    finally:
+        app.dependency_overrides[get_db] = override_get_db
+        await engine.dispose()
+
+@pytest.fixture
+async def async_session_factory():
+    async with async_sessions(ASYNC_TEST_DATABASE_URL) as factory:
+        yield factory
+
+@pytest.fixture
+async def racing_session_factory(tmp_path):
+    # Sessions on the shared in-memory SQLite connection would share one transaction, so racing sessions get a file
+    url = ASYNC_TEST_DATABASE_URL
+    if make_url(url).get_backend_name() == "sqlite":
+        url = f"sqlite+aiosqlite:///{tmp_path / 'race.db'}"
+    async with async_sessions(url) as factory:
+        yield factory
+
+@pytest.mark.asyncio
+async def test_user_flow_on_async_session(client, async_session_factory):
+    user_data = {
+        "email": "async@example.com",
+        "mobile": "09123456789",
+        "firstName": "Async",
+        "middleName": "Db",
+        "lastName": "User",
+        "username": "asyncuser",
+        "plain_password": "asyncpass",
+        "role": "User"
+    }
+    response = await client.post("/users/register", json=user_data)
+    assert response.status_code == 201
+
+    response = await client.post("/users/register", json=user_data)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Email already exists"}
+
+    response = await client.post("/auth/token", data={"username": "asyncuser", "password": "asyncpass"})
+    assert response.status_code == 200
+    tokens = response.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = await client.get("/users", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["totalCount"] == 1
+
+    response = await client.put("/users/update/1", headers=headers, json={"firstName": "Updated"})
+    assert response.status_code == 200
+    assert response.json()["completeName"] == "Updated Db User"
+
+    response = await client.get("/users/1", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["firstName"] == "Updated"
+
+    response = await client.put("/users/change/password/1", headers=headers, json={"current_password": "asyncpass", "new_password": "newpass"})
+    assert response.status_code == 200
+
+    response = await client.post("/auth/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+
+    async with async_session_factory() as db:
+        actions = (await db.execute(select(ActionLog.action))).scalars().all()
+    assert "register_user" in actions
+    assert "login" in actions
+    assert "verify_token" in actions
+
+@pytest.mark.asyncio
+async def test_concurrent_refreshes_with_one_token_rotate_once(client, racing_session_factory):
+    user_data = {
+        "email": "race@example.com", "mobile": "09123456789", "firstName": "Race", "middleName": "Db",
+        "lastName": "User", "username": "raceuser", "plain_password": "racepass", "role": "User"
+    }
+    assert (await client.post("/users/register", json=user_data)).status_code == 201
+    refresh_token = (await client.post("/auth/token", data={"username": "raceuser", "password": "racepass"})).json()["refresh_token"]
+
+    responses = await asyncio.gather(*(client.post("/auth/token/refresh", json={"refresh_token": refresh_token}) for _ in range(8)))
+
+    assert sorted(response.status_code for response in responses) == [200] + [401] * 7
+    async with racing_session_factory() as db:
+        active = (await db.execute(select(RefreshToken).where(RefreshToken.revoked.is_(False)))).scalars().all()
+    new_refresh_token = next(response.json()["refresh_token"] for response in responses if response.status_code == 200)
+    assert [token.token_hash for token in active] == [hash_token(new_refresh_token)]
+
+@pytest.mark.asyncio
+async def test_lifespan_disposes_async_engines(monkeypatch):
+    import threading
+    from sqlalchemy import text
+    from .. import config, main
+
+    def aiosqlite_threads():
+        return [thread for thread in threading.enumerate() if "_connection_worker_thread" in thread.name]
+
+    monkeypatch.setattr(config, "AUDIT_LOG_BATCHING", False)
+    monkeypatch.setattr(config, "RETENTION_SWEEP_ENABLED", False)
+    engines = [create_async_engine("sqlite+aiosqlite://") for _ in range(2)]
+    monkeypatch.setattr(main, "async_engine", engines[0])
+    monkeypatch.setattr(main, "async_read_engine", engines[1])
+    threads_before = set(aiosqlite_threads())
+
+    async with main.lifespan(main.app):
+        for engine in engines:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        engine_threads = set(aiosqlite_threads()) - threads_before
+        assert len(engine_threads) == 2
+
+    # Pooled aiosqlite connections each hold a non-daemon thread that would keep the process from exiting
+    for thread in engine_threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import select
+from .test_db import engine, TestingSessionLocal
+from ..audit import AuditLogWriter
+from ..models import ActionLog
+
+def audit_rows():
+    db = TestingSessionLocal()
+    try:
+        return db.execute(select(ActionLog.action, ActionLog.username, ActionLog.timestamp)).all()
+    finally:
+        db.close()
+
+@pytest.mark.asyncio
+async def test_audit_writer_flushes_in_batches_and_drains_on_stop():
+    writer = AuditLogWriter(engine, batch_size=10, flush_interval=60)
+    writer.start()
+    for i in range(25):
+        assert await writer.enqueue({"action": "login", "status": "success", "username": f"user{i}"})
+    writer.stop()
+
+    rows = audit_rows()
+    assert len(rows) == 25
+    assert all(row.timestamp is not None for row in rows)
+    stats = writer.stats()
+    assert stats["written"] == 25
+    assert stats["batches"] == 3
+    assert stats["max_batch_size"] == 10
+    assert stats["queue_depth"] == 0
+    assert not stats["running"]
+
+@pytest.mark.asyncio
+async def test_audit_writer_drops_rows_when_queue_is_full():
+    writer = AuditLogWriter(engine, max_queue_size=1, overflow_policy="drop")
+    assert await writer.enqueue({"action": "login", "status": "success"})
+    assert not await writer.enqueue({"action": "login", "status": "failed"})
+    assert writer.stats()["dropped"] == 1
+
+@pytest.mark.asyncio
+async def test_audit_writer_block_policy_waits_for_room():
+    writer = AuditLogWriter(engine, max_queue_size=1, overflow_policy="block", block_timeout=0.05)
+    assert await writer.enqueue({"action": "login", "status": "success"})
+    assert not await writer.enqueue({"action": "login", "status": "failed"})
+
+    writer.start()
+    assert await writer.enqueue({"action": "logout", "status": "success"})
+    writer.stop()
+    assert [row.action for row in audit_rows()] == ["login", "logout"]
+
+@pytest.mark.asyncio
+async def test_log_action_uses_running_audit_writer(client, create_user_token, monkeypatch):
+    from .. import logger as logger_module
+
+    writer = AuditLogWriter(engine, flush_interval=60)
+    monkeypatch.setattr(logger_module, "audit_writer", writer)
+    before = len(audit_rows())
+    writer.start()
+    response = await client.put("/users/update/1", headers={"Authorization": create_user_token}, json={"role": "Admin"})
+    assert response.status_code == 200
+    assert len(audit_rows()) == before
+    writer.stop()
+
+    assert len(audit_rows()) == before + 2
+    assert writer.stats()["written"] == 2
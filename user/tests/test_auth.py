@@ -8,7 +8,7 @@ from httpx import ASGITransport
 from datetime import datetime, timedelta, UTC
 from jose import jwt
 from uuid import uuid4
-from ..auth.auth import SECRET_KEY, ALGORITHM
+from ..auth.token_utils import SECRET_KEY, ALGORITHM, hash_token
 
 @pytest.mark.asyncio
 async def test_token_endpoint():
@@ -113,8 +113,10 @@ async def test_refresh_token_errors(client, refresh_token_payload, secret, expec
     # Insert the refresh token in DB if this is the success case to simulate valid token
     if expected_status == 200:
         db = TestingSessionLocal()
+        db.add(User(id=1, email="call@gmil.com", mobile="09231111890", firstName="Call", lastName="Maybe", completeName="Call Maybe", role="HR"))
+        db.commit()
         db_token = RefreshToken(
-            token=refresh_token,
+            token_hash=hash_token(refresh_token),
             user_id=1,
             expires_at=datetime.now(UTC) + timedelta(days=30)
         )
@@ -138,3 +140,253 @@ async def test_refresh_token_errors(client, refresh_token_payload, secret, expec
         assert "access_token" in json_data
         assert "refresh_token" in json_data
         assert json_data["token_type"] == "bearer"
+
+@pytest.mark.asyncio
+async def test_password_hasher_records_wait_and_compute_time():
+    from ..auth.hashing import PasswordHasher
+
+    hasher = PasswordHasher(max_workers=1, queue_depth=1)
+    try:
+        hashed = await hasher.hash("testpass")
+        assert await hasher.verify("testpass", hashed)
+        assert not await hasher.verify("wrongpass", hashed)
+    finally:
+        hasher.shutdown()
+
+    stats = hasher.stats()
+    assert stats["calls"] == 3
+    assert stats["rejected"] == 0
+    assert stats["in_flight"] == 0
+    assert stats["compute_seconds_total"] > 0
+    assert stats["wait_seconds_total"] >= 0
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_saturated():
+    import asyncio
+    from fastapi import HTTPException
+    from ..auth.hashing import PasswordHasher
+
+    hasher = PasswordHasher(max_workers=1, queue_depth=0)
+    try:
+        results = await asyncio.gather(hasher.hash("first"), hasher.hash("second"), return_exceptions=True)
+    finally:
+        hasher.shutdown()
+
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1
+    assert rejected[0].status_code == 503
+    assert hasher.stats()["rejected"] == 1
+
+@pytest.mark.asyncio
+async def test_token_endpoint_returns_503_when_hash_pool_saturated(client, monkeypatch):
+    from ..auth.hashing import password_hasher
+
+    db = TestingSessionLocal()
+    try:
+        user = User(email="busy@gmil.com", mobile="09231111890", firstName="Busy", lastName="Pool", completeName="Busy Pool", role="HR")
+        db.add(user)
+        db.commit()
+        db.add(Credential(user_id=user.id, username="busyuser", hashed_password=get_password_hash("testpass")))
+        db.commit()
+    finally:
+        db.close()
+
+    monkeypatch.setattr(password_hasher, "_in_flight", password_hasher.max_workers + password_hasher.queue_depth)
+    response = await client.post("/auth/token", data={"username": "busyuser", "password": "testpass"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+@pytest.mark.asyncio
+async def test_get_current_user_serves_repeat_requests_from_principal_cache(client, create_user_token):
+    from sqlalchemy import func, select
+    from ..models import ActionLog
+    from ..auth.principal_cache import principal_cache
+
+    def verify_token_rows():
+        db = TestingSessionLocal()
+        try:
+            return db.execute(select(func.count()).select_from(ActionLog).where(ActionLog.action == "verify_token")).scalar_one()
+        finally:
+            db.close()
+
+    hits_before = principal_cache.stats()["hits"]
+    for _ in range(3):
+        response = await client.get("/users/2", headers={"Authorization": create_user_token})
+        assert response.status_code == 200
+
+    assert principal_cache.stats()["hits"] - hits_before == 2
+    assert verify_token_rows() == 1
+
+    response = await client.put("/users/update/1", headers={"Authorization": create_user_token}, json={"role": "Admin"})
+    assert response.status_code == 200
+    response = await client.get("/users/2", headers={"Authorization": create_user_token})
+    assert response.status_code == 200
+    assert verify_token_rows() == 2
+
+def test_principal_cache_entry_is_bounded_by_token_exp():
+    import time
+    from ..auth.principal_cache import Principal, PrincipalCache
+
+    cache = PrincipalCache(maxsize=10, ttl=300)
+    principal = Principal(user_id=1, username="testuser")
+    cache.set("live", principal, exp=time.time() + 60, generation=cache.generation(1))
+    cache.set("expired", principal, exp=time.time() - 1, generation=cache.generation(1))
+
+    assert cache.get("live") == principal
+    assert cache.get("expired") is None
+
+    cache.invalidate_user(1)
+    assert cache.get("live") is None
+    assert cache.stats()["invalidations"] == 1
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_stored_as_digest(client, create_user_token):
+    response = await client.post("/auth/token", data={"username": "testuser", "password": "testpass"})
+    refresh_token = response.json()["refresh_token"]
+
+    db = TestingSessionLocal()
+    try:
+        stored = [row.token_hash for row in db.query(RefreshToken).all()]
+    finally:
+        db.close()
+
+    assert hash_token(refresh_token) in stored
+    assert all(len(token_hash) == 64 and token_hash != refresh_token for token_hash in stored)
+
+@pytest.mark.asyncio
+async def test_introspect_reports_each_token(client, create_user_token):
+    from ..auth.introspection import token_introspector
+
+    access_token = create_user_token.removeprefix("Bearer ")
+    refresh_token = (await client.post("/auth/token", data={"username": "testuser", "password": "testpass"})).json()["refresh_token"]
+    expired_token = jwt.encode({"sub": "1", "exp": datetime.now(UTC) - timedelta(minutes=1), "token_type": "access"}, SECRET_KEY, algorithm=ALGORITHM)
+
+    tokens = [access_token, refresh_token, expired_token, "garbage", access_token]
+    response = await client.post("/auth/token/introspect", json={"tokens": tokens}, headers={"Authorization": create_user_token})
+
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["active"] for result in results] == [True, False, False, False, True]
+    assert results[0]["sub"] == 1 and results[0]["exp"] == jwt.get_unverified_claims(access_token)["exp"]
+    assert results[1] == {"active": False, "sub": None, "exp": None}
+    # The repeated token and a second call are answered from the caches
+    stats = token_introspector.stats()
+    assert stats["active"]["hits"] >= 1
+    await client.post("/auth/token/introspect", json={"tokens": ["garbage"]}, headers={"Authorization": create_user_token})
+    assert token_introspector.stats()["inactive"]["hits"] == stats["inactive"]["hits"] + 1
+
+@pytest.mark.asyncio
+async def test_introspect_rejects_oversized_batches(client, monkeypatch):
+    from .. import config
+
+    monkeypatch.setattr(config, "TOKEN_INTROSPECT_MAX_TOKENS", 2)
+    monkeypatch.setattr(config, "TOKEN_INTROSPECT_CLIENT_SECRET", "gateway-secret")
+    response = await client.post("/auth/token/introspect", json={"tokens": ["a", "b", "c"]}, headers={"X-Client-Secret": "gateway-secret"})
+    assert response.status_code == 413
+
+@pytest.mark.asyncio
+async def test_introspect_requires_a_caller_credential(client, monkeypatch):
+    from .. import config
+
+    monkeypatch.setattr(config, "TOKEN_INTROSPECT_CLIENT_SECRET", "gateway-secret")
+    for headers in ({}, {"X-Client-Secret": "wrong"}, {"Authorization": "Bearer garbage"}):
+        response = await client.post("/auth/token/introspect", json={"tokens": ["a"]}, headers=headers)
+        assert response.status_code == 401
+
+    response = await client.post("/auth/token/introspect", json={"tokens": ["a"]}, headers={"X-Client-Secret": "gateway-secret"})
+    assert response.status_code == 200
+    assert response.json() == {"data": [{"active": False, "sub": None, "exp": None}]}
+
+@pytest.mark.asyncio
+async def test_logout_revokes_access_and_refresh_token(client, create_user_token):
+    tokens = (await client.post("/auth/token", data={"username": "testuser", "password": "testpass"})).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await client.get("/users/1", headers=headers)).status_code == 200
+
+    response = await client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers)
+    assert response.status_code == 204
+
+    response = await client.get("/users/1", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+    response = await client.post("/auth/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+    # Other sessions of the user are untouched
+    assert (await client.get("/users/1", headers={"Authorization": create_user_token})).status_code == 200
+
+@pytest.mark.asyncio
+async def test_revoke_all_sessions(client, create_user_token, monkeypatch):
+    from .. import config
+
+    monkeypatch.setattr(config, "TOKEN_INTROSPECT_CLIENT_SECRET", "gateway-secret")
+    gateway = {"X-Client-Secret": "gateway-secret"}
+    other = (await client.post("/auth/token", data={"username": "testuser", "password": "testpass"})).json()
+    other_access_token = other["access_token"]
+    response = await client.post("/auth/token/introspect", json={"tokens": [other_access_token]}, headers=gateway)
+    assert response.json()["data"][0]["active"] is True
+
+    response = await client.post("/auth/sessions/revoke-all", headers={"Authorization": create_user_token})
+    assert response.status_code == 200
+    assert response.json() == {"revoked_refresh_tokens": 2}
+
+    for token in (create_user_token.removeprefix("Bearer "), other_access_token):
+        assert (await client.get("/users/1", headers={"Authorization": f"Bearer {token}"})).status_code == 401
+    assert (await client.post("/auth/token/refresh", json={"refresh_token": other["refresh_token"]})).status_code == 401
+    response = await client.post("/auth/token/introspect", json={"tokens": [other_access_token]}, headers=gateway)
+    assert response.json()["data"][0]["active"] is False
+
+    # Logging in again afterwards gives a working session
+    tokens = (await client.post("/auth/token", data={"username": "testuser", "password": "testpass"})).json()
+    assert (await client.get("/users/1", headers={"Authorization": f"Bearer {tokens['access_token']}"})).status_code == 200
+
+@pytest.mark.asyncio
+async def test_login_throttle_rejects_before_password_check(client, monkeypatch):
+    from sqlalchemy import select
+    from ..models import ActionLog
+    from ..auth import auth as auth_module
+    from ..auth.rate_limit import login_throttle
+
+    checked = []
+
+    async def fake_authenticate_user(db, username, plain_password):
+        checked.append(username)
+        return None
+
+    monkeypatch.setattr(auth_module, "authenticate_user", fake_authenticate_user)
+    burst = login_throttle.by_username.burst
+    rejected_before = login_throttle.by_username.stats()["rejected"]
+    responses = [await client.post("/auth/token", data={"username": "victim", "password": "guess"}) for _ in range(burst + 3)]
+
+    assert [response.status_code for response in responses] == [401] * burst + [429] * 3
+    assert int(responses[-1].headers["Retry-After"]) >= 1
+    assert len(checked) == burst
+    assert login_throttle.by_username.stats()["rejected"] - rejected_before == 3
+    # Other usernames are not affected
+    assert (await client.post("/auth/token", data={"username": "someone", "password": "guess"})).status_code == 401
+
+    db = TestingSessionLocal()
+    try:
+        failed = db.execute(select(ActionLog.username).where(ActionLog.action == "login", ActionLog.status == "failed")).scalars().all()
+    finally:
+        db.close()
+    # Every checked attempt plus one row for the throttled run
+    assert failed.count("victim") == burst + 1
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    from types import SimpleNamespace
+    from ..auth import rate_limit
+
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    limiter = rate_limit.TokenBucketLimiter(burst=2, rate_per_minute=6, max_keys=2)
+
+    assert limiter.acquire("a") == (0.0, 0)
+    assert limiter.acquire("a") == (0.0, 0)
+    assert limiter.acquire("a") == (10.0, 1)
+    now[0] += 10
+    assert limiter.acquire("a") == (0.0, 0)
+
+    limiter.acquire("b")
+    limiter.acquire("c")
+    assert limiter.stats()["keys"] == 2
@@ -1,12 +1,31 @@
+import os
+import tempfile
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from ..db import Base, get_db
 from ..main import app
 
-TEST_DATABASE_URL = "sqlite:///:memory:"
+def resolve_test_database_url() -> str:
+    """
+    Pick the database the suite runs against from TEST_DATABASE_URL.
+    Unset runs on in-memory SQLite, a URL runs on that database (it is wiped by every test),
+    and "pgserver" starts a throwaway local PostgreSQL through the pgserver package.
+    """
+    url = os.getenv("TEST_DATABASE_URL", "sqlite:///:memory:")
+    if url == "pgserver":
+        import pgserver
+        server = pgserver.get_server(tempfile.mkdtemp(prefix="user-tests-pg-"), cleanup_mode="delete")
+        url = server.get_uri()
+    return url
 
-engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TEST_DATABASE_URL = resolve_test_database_url()
+
+if make_url(TEST_DATABASE_URL).get_backend_name() == "sqlite":
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+else:
+    engine = create_engine(TEST_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def override_get_db():
@@ -24,4 +43,4 @@ def setup_test_db():
     Base.metadata.create_all(bind=engine)
 
 def teardown_test_db():
-    Base.metadata.drop_all(bind=engine)
\ No newline at end of file
+    Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,79 @@
+import warnings
+import pytest
+from fastapi import HTTPException
+from cryptography.hazmat.primitives import serialization
+from jose import jwt
+from ..auth import token_utils
+from ..auth.keys import KeyRing, generate_key
+from .. import main
+
+def write_public_half(private_path, directory):
+    private_key = serialization.load_pem_private_key(private_path.read_bytes(), password=None)
+    public_pem = private_key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    (directory / private_path.name).write_bytes(public_pem)
+
+def test_rotated_out_key_still_verifies_its_tokens(tmp_path, monkeypatch):
+    old_dir, new_dir = tmp_path / "old", tmp_path / "new"
+    old_key = generate_key(old_dir, "RS256")
+    new_key = new_dir / "2099.pem"
+    new_dir.mkdir()
+    generate_key(tmp_path / "scratch", "RS256").rename(new_key)
+
+    monkeypatch.setattr(token_utils, "key_ring", KeyRing.from_directory(old_dir, "RS256"))
+    old_token = token_utils.create_access_token({"sub": "1"})
+    assert jwt.get_unverified_header(old_token) == {"alg": "RS256", "kid": old_key.stem, "typ": "JWT"}
+
+    # Rotate: the new key signs, the old key is kept as its public half for verification only
+    write_public_half(old_key, new_dir)
+    ring = KeyRing.from_directory(new_dir, "RS256")
+    assert ring.active.kid == "2099"
+    assert not ring.get(old_key.stem).can_sign
+    monkeypatch.setattr(token_utils, "key_ring", ring)
+
+    new_token = token_utils.create_access_token({"sub": "2"})
+    assert jwt.get_unverified_header(new_token)["kid"] == "2099"
+    assert token_utils.verify_access_token(old_token) == 1
+    assert token_utils.verify_access_token(new_token) == 2
+
+def test_token_with_unknown_kid_is_rejected(tmp_path, monkeypatch):
+    generate_key(tmp_path, "ES256")
+    other = KeyRing.from_directory(generate_key(tmp_path / "other", "ES256").parent, "ES256")
+    monkeypatch.setattr(token_utils, "key_ring", KeyRing.from_directory(tmp_path, "ES256"))
+
+    token = jwt.encode({"sub": "1", "token_type": "access"}, other.active.key, algorithm="ES256", headers={"kid": "unknown"})
+    with pytest.raises(HTTPException) as exc_info:
+        token_utils.verify_access_token(token)
+    assert exc_info.value.detail == "Invalid token"
+
+def test_public_key_cannot_be_the_signing_key(tmp_path):
+    private_path = generate_key(tmp_path / "private", "RS256")
+    write_public_half(private_path, tmp_path)
+    with pytest.raises(ValueError):
+        KeyRing.from_directory(tmp_path, "RS256")
+
+@pytest.mark.asyncio
+async def test_jwks_endpoint_publishes_public_keys(client, tmp_path, monkeypatch):
+    response = await client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}  # the default HS256 secret is never published
+
+    key_path = generate_key(tmp_path, "RS256")
+    monkeypatch.setattr(main, "key_ring", KeyRing.from_directory(tmp_path, "RS256"))
+    response = await client.get("/.well-known/jwks.json")
+
+    assert response.headers["cache-control"] == "public, max-age=300"
+    [published] = response.json()["keys"]
+    assert published["kid"] == key_path.stem
+    assert published["kty"] == "RSA"
+    assert published["alg"] == "RS256"
+    assert "d" not in published
+
+def test_decode_uses_the_pre_parsed_public_key(tmp_path, monkeypatch):
+    generate_key(tmp_path, "RS256")
+    monkeypatch.setattr(token_utils, "key_ring", KeyRing.from_directory(tmp_path, "RS256"))
+    token = token_utils.create_access_token({"sub": "1"})
+
+    with warnings.catch_warnings():
+        # jose warns whenever it has to derive the public key from a private one to verify
+        warnings.simplefilter("error")
+        assert token_utils.verify_access_token(token) == 1
@@ -0,0 +1,27 @@
+import json
+import logging
+from ..logger import JsonFormatter, SamplingFilter, parse_sample_rates
+
+def make_record(name: str, level: int = logging.INFO, msg: str = "Access token verification attempt", args=(), **extra) -> logging.LogRecord:
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_json_formatter_renders_lazy_arguments_and_extra_fields():
+    line = JsonFormatter().format(make_record("user-management", msg="User updated successfully: user_id=%s", args=(7,), request_id="abc"))
+    entry = json.loads(line)
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "user-management"
+    assert entry["message"] == "User updated successfully: user_id=7"
+    assert entry["request_id"] == "abc"
+    assert entry["timestamp"].endswith("+00:00")
+
+def test_sampling_filter_keeps_one_in_n_info_records_of_configured_loggers():
+    sampler = SamplingFilter(parse_sample_rates("user.auth=0.25, user.routes=0"))
+
+    kept = [sampler.filter(make_record("user.auth.token_utils")) for _ in range(8)]
+    assert kept.count(True) == 2
+    assert sampler.filter(make_record("user.auth.token_utils", level=logging.WARNING))
+    assert not sampler.filter(make_record("user.routes"))
+    assert all(sampler.filter(make_record("user-management")) for _ in range(3))
+    assert sampler.dropped == 7
@@ -0,0 +1,82 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from .test_db import engine, TestingSessionLocal
+from ..maintenance import RetentionSweeper
+from ..models import ActionLog, RefreshToken, User
+
+def seed_rows(now: datetime):
+    db = TestingSessionLocal()
+    try:
+        db.add(User(id=1, email="call@gmil.com", mobile="09231111890", firstName="Call", lastName="Maybe", completeName="Call Maybe",
+                    role="HR", created_at=now))
+        db.commit()
+        db.add_all([
+            RefreshToken(token_hash="live".ljust(64, "0"), user_id=1, expires_at=now + timedelta(days=1), revoked=False),
+            RefreshToken(token_hash="revoked".ljust(64, "0"), user_id=1, expires_at=now + timedelta(days=1), revoked=True),
+        ])
+        db.add_all([
+            RefreshToken(token_hash=f"expired{i}".ljust(64, "0"), user_id=1, expires_at=now - timedelta(minutes=1), revoked=False)
+            for i in range(5)
+        ])
+        db.add_all([ActionLog(action="login", status="success", timestamp=now - timedelta(days=100)) for _ in range(7)])
+        db.add(ActionLog(action="login", status="success", timestamp=now - timedelta(days=1)))
+        db.commit()
+    finally:
+        db.close()
+
+def remaining_rows():
+    db = TestingSessionLocal()
+    try:
+        return (
+            db.execute(select(RefreshToken.token_hash)).scalars().all(),
+            db.execute(select(ActionLog.timestamp)).scalars().all(),
+        )
+    finally:
+        db.close()
+
+def test_sweep_purges_expired_tokens_and_old_audit_rows_in_batches():
+    now = datetime.now(timezone.utc)
+    seed_rows(now)
+
+    sweeper = RetentionSweeper(engine, batch_size=2, batch_pause=0, action_log_retention_days=30)
+    result = sweeper.sweep(now)
+
+    assert result["refresh_tokens"] == 6
+    assert result["action_logs"] == 7
+    tokens, logs = remaining_rows()
+    assert tokens == ["live".ljust(64, "0")]
+    assert len(logs) == 1
+
+    assert sweeper.sweep(now)["refresh_tokens"] == 0
+    stats = sweeper.stats()
+    assert stats["sweeps"] == 2
+    assert stats["refresh_tokens_purged"] == 6
+    assert stats["action_logs_purged"] == 7
+
+def test_sweep_keeps_audit_rows_when_retention_is_disabled():
+    now = datetime.now(timezone.utc)
+    seed_rows(now)
+
+    sweeper = RetentionSweeper(engine, batch_pause=0, action_log_retention_days=0)
+    assert sweeper.sweep(now)["action_logs"] == 0
+    assert len(remaining_rows()[1]) == 8
+
+@pytest.mark.asyncio
+async def test_sweep_keeps_recent_rows_written_without_the_audit_writer():
+    from ..audit import audit_writer
+    from ..logger import log_action
+
+    assert not audit_writer.running
+    now = datetime.now(timezone.utc)
+    db = TestingSessionLocal()
+    try:
+        await log_action(db, action="login", status="success")
+    finally:
+        db.close()
+
+    # A retention window of a fraction of a second still keeps the row that was just written inline
+    sweeper = RetentionSweeper(engine, batch_pause=0, action_log_retention_days=1 / 86400)
+    assert sweeper.sweep(now)["action_logs"] == 0
+    [timestamp] = remaining_rows()[1]
+    assert (timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)) >= now
@@ -0,0 +1,66 @@
+import pytest
+from ..metrics import Histogram, MetricsRegistry, http_requests, http_request_db_queries, instrument_engine
+from .test_db import engine
+
+instrument_engine(engine)
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_requests_by_route_template(client, create_user_token):
+    requests_before = http_requests.value(("GET", "/users/{user_id}", 200))
+    queries_before = http_request_db_queries.count(("/users/{user_id}",))
+    for user_id in (1, 2):
+        response = await client.get(f"/users/{user_id}", headers={"Authorization": create_user_token})
+        assert response.status_code == 200
+    await client.get("/no/such/path")
+
+    assert http_requests.value(("GET", "/users/{user_id}", 200)) - requests_before == 2
+    assert http_request_db_queries.count(("/users/{user_id}",)) - queries_before == 2
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/users/{user_id}",status="200"}' in body
+    assert 'route="unmatched",status="404"' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/users/{user_id}",le="+Inf"}' in body
+    assert "http_request_db_seconds_total" in body
+    assert "db_query_duration_seconds_count" in body
+    assert "password_hasher_compute_seconds_total" in body
+    assert "audit_writer_queue_depth" in body
+    assert "user_cache_hit_ratio" in body
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(("/a",), value)
+    registry.register_stats("component", lambda: {"hits": 3, "running": True, "nested": {"rows": 2}, "kind": "thread"})
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 4.25' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+    assert "component_hits 3" in lines
+    assert "component_running 1" in lines
+    assert "component_nested_rows 2" in lines
+    assert not any(line.startswith("component_kind") for line in lines)
+
+def test_failed_query_is_counted_and_releases_its_start_time():
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.pool import StaticPool
+    from ..metrics import db_query_errors
+
+    failing_engine = create_engine("sqlite://", poolclass=StaticPool)
+    instrument_engine(failing_engine)
+    errors_before = db_query_errors.value()
+    with failing_engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_such_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info["query_started"] == []
+
+    assert db_query_errors.value() - errors_before == 3
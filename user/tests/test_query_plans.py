@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import event
+from .test_db import engine
+
+pytestmark = pytest.mark.skipif(engine.dialect.name != "sqlite", reason="EXPLAIN QUERY PLAN is SQLite specific")
+
+@pytest.fixture
+def captured_statements():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")) and "WHERE" in statement.upper().split():
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+def query_plan(statement: str, parameters) -> list[str]:
+    with engine.connect() as conn:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            return [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()]
+        finally:
+            cursor.close()
+
+def assert_uses_index(statement: str, parameters) -> None:
+    plan = query_plan(statement, parameters)
+    for step in plan:
+        if step.startswith("SCAN"):
+            assert "COVERING INDEX" in step, f"Full scan in {statement!r}: {plan}"
+        elif step.startswith("SEARCH"):
+            assert "USING" in step, f"Unindexed search in {statement!r}: {plan}"
+
+@pytest.mark.asyncio
+async def test_hot_queries_use_indexes(client, create_user_token, captured_statements):
+    token = create_user_token
+    response = await client.get("/users", params={"status": "active", "limit": 1}, headers={"Authorization": token})
+    assert response.status_code == 200
+    response = await client.get("/users", params={"status": "active", "limit": 1, "cursor": response.json()["nextCursor"]}, headers={"Authorization": token})
+    assert response.status_code == 200
+    response = await client.get("/users/2", headers={"Authorization": token})
+    assert response.status_code == 200
+    response = await client.get("/users/1", headers={"Authorization": token, "If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    response = await client.post("/users/batch", json={"ids": [3, 1]}, headers={"Authorization": token})
+    assert response.status_code == 200
+
+    response = await client.post("/auth/token", data={"username": "testuser", "password": "testpass"})
+    response = await client.post("/auth/token/refresh", json={"refresh_token": response.json()["refresh_token"]})
+    assert response.status_code == 200
+
+    tables = " ".join(statement for statement, _ in captured_statements)
+    for table in ("users", "credentials"):
+        assert f"FROM {table}" in tables
+    assert "UPDATE refresh_tokens" in tables
+    for statement, parameters in captured_statements:
+        assert_uses_index(statement, parameters)
+
+@pytest.mark.parametrize("statement, parameters", [
+    ("SELECT id FROM refresh_tokens WHERE user_id = ? AND revoked = 0", (1,)),
+    ("SELECT id FROM action_logs WHERE user_id = ? ORDER BY timestamp DESC LIMIT 20", (1,)),
+    ("SELECT id FROM action_logs WHERE timestamp < ? LIMIT 500", ("2025-01-01 00:00:00",)),
+    ("SELECT count(*) FROM users WHERE status = ?", ("active",)),
+])
+def test_per_user_and_retention_lookups_use_indexes(statement, parameters):
+    assert_uses_index(statement, parameters)
+    assert not any("TEMP B-TREE" in step for step in query_plan(statement, parameters))
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from .. import config, db as db_module
+from ..db import Base, configure_sqlite_engine, get_read_db
+
+@pytest.fixture
+def file_engines(tmp_path):
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    write_engine = create_engine(url, connect_args={"check_same_thread": False})
+    configure_sqlite_engine(write_engine)
+    read_engine = create_engine(url, connect_args={"check_same_thread": False})
+    configure_sqlite_engine(read_engine, read_only=True)
+    Base.metadata.create_all(write_engine)
+    yield write_engine, read_engine
+    write_engine.dispose()
+    read_engine.dispose()
+
+def test_sqlite_profile_is_applied_on_connect(file_engines):
+    write_engine, _ = file_engines
+    with write_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == config.SQLITE_BUSY_TIMEOUT_MS
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == config.SQLITE_CACHE_SIZE
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 0
+
+def test_read_only_pool_rejects_writes(file_engines):
+    write_engine, read_engine = file_engines
+    with write_engine.begin() as conn:
+        conn.execute(text("INSERT INTO action_logs (action, status) VALUES ('login', 'success')"))
+
+    with read_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM action_logs")).scalar() == 1
+        with pytest.raises(OperationalError, match="readonly"):
+            conn.execute(text("INSERT INTO action_logs (action, status) VALUES ('login', 'failed')"))
+
+@pytest.mark.asyncio
+async def test_get_read_db_uses_read_only_pool_when_enabled(file_engines, monkeypatch):
+    _, read_engine = file_engines
+    monkeypatch.setattr(config, "SQLITE_READ_ONLY_POOL", True)
+    monkeypatch.setattr(db_module, "ReadSessionLocal", sessionmaker(bind=read_engine))
+
+    request_db = object()
+    dependency = get_read_db(request_db)
+    read_db = await dependency.__anext__()
+    try:
+        assert read_db is not request_db
+        assert read_db.execute(text("PRAGMA query_only")).scalar() == 1
+    finally:
+        await dependency.aclose()
+
+@pytest.mark.asyncio
+async def test_get_read_db_reuses_request_session_by_default():
+    request_db = object()
+    dependency = get_read_db(request_db)
+    assert await dependency.__anext__() is request_db
+    await dependency.aclose()
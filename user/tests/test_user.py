@@ -90,7 +90,9 @@ async def test_register_user_success(client):
     "email1, email2, username1, username2, expected_status, expected_detail", 
     [
         ("exists@example.com", "another@example.com", "testuser", "testuser", 400, "Username already exists"),
-        ("duplicate@example.com", "duplicate@example.com", "testuser", "testuser1", 400, "Email already exists")
+        ("duplicate@example.com", "duplicate@example.com", "testuser", "testuser1", 400, "Email already exists"),
+        # The offending value appears in PostgreSQL's error detail, so it must not decide which field is reported
+        ("username@example.com", "username@example.com", "testuser", "testuser1", 400, "Email already exists")
     ])
 async def test_register_user_fail_duplicate_email_username (client, email1, email2, username1, username2, expected_status, expected_detail):
     db = TestingSessionLocal()
@@ -305,3 +307,257 @@ async def test_change_user_password_wrong_password(client, create_user_token):
 
     assert response.status_code == 404
     assert response.json() == {"detail": "Credential not found"}
+
+@pytest.mark.asyncio
+async def test_get_all_users_cursor_pagination(client, create_user_token):
+    token = create_user_token
+    response = await client.get("/users", params={"limit": 2}, headers={"Authorization": token})
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [user["id"] for user in first_page["data"]] == [1, 2]
+    assert first_page["nextCursor"]
+
+    response = await client.get("/users", params={"limit": 2, "cursor": first_page["nextCursor"]}, headers={"Authorization": token})
+    assert response.status_code == 200
+    second_page = response.json()
+    assert [user["id"] for user in second_page["data"]] == [3]
+    assert second_page["nextCursor"] is None
+
+@pytest.mark.asyncio
+async def test_get_all_users_cursor_pagination_with_status(client, create_user_token):
+    token = create_user_token
+    response = await client.get("/users", params={"limit": 1, "status": "active"}, headers={"Authorization": token})
+    first_page = response.json()
+    assert [user["id"] for user in first_page["data"]] == [2]
+
+    response = await client.get("/users", params={"limit": 1, "status": "active", "cursor": first_page["nextCursor"]}, headers={"Authorization": token})
+    second_page = response.json()
+    assert [user["id"] for user in second_page["data"]] == [3]
+    assert all(user["status"] == "active" for user in second_page["data"])
+
+@pytest.mark.asyncio
+async def test_get_all_users_invalid_cursor(client, create_user_token):
+    response = await client.get("/users", params={"cursor": "not-a-cursor"}, headers={"Authorization": create_user_token})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+@pytest.mark.asyncio
+async def test_get_all_users_total_count_respects_status(client, create_user_token):
+    token = create_user_token
+    response = await client.get("/users", params={"status": "active"}, headers={"Authorization": token})
+    assert response.json()["totalCount"] == 2
+
+    response = await client.get("/users", params={"status": "inactive"}, headers={"Authorization": token})
+    assert response.json()["totalCount"] == 1
+
+@pytest.mark.asyncio
+async def test_get_all_users_total_count_modes(client, create_user_token):
+    from ..crud import user_counts
+
+    token = create_user_token
+    response = await client.get("/users", params={"include_total": "false"}, headers={"Authorization": token})
+    assert response.status_code == 200
+    assert response.json()["totalCount"] is None
+    assert user_counts.get(None) is None
+
+    response = await client.get("/users", params={"include_total": "estimate"}, headers={"Authorization": token})
+    assert response.json()["totalCount"] == 3
+
+    response = await client.get("/users", headers={"Authorization": token})
+    assert response.json()["totalCount"] == 3
+
+    user_data = {
+        "email": "counted@example.com",
+        "mobile": "09123456789",
+        "firstName": "Counted",
+        "lastName": "User",
+        "username": "counteduser",
+        "plain_password": "testpass",
+        "role": "User"
+    }
+    response = await client.post("/users/register", json=user_data)
+    assert response.status_code == 201
+    assert user_counts.get(None) == 4
+
+    response = await client.get("/users", params={"include_total": "estimate"}, headers={"Authorization": token})
+    assert response.json()["totalCount"] == 4
+
+@pytest.mark.asyncio
+async def test_get_all_users_items_match_user_out(client, create_user_token):
+    token = create_user_token
+    page = (await client.get("/users", headers={"Authorization": token})).json()
+    single = (await client.get("/users/2", headers={"Authorization": token})).json()
+
+    assert page["data"][1] == single
+    assert set(page) == {"totalCount", "offset", "limit", "data", "nextCursor"}
+
+def bulk_user(i: int, **overrides) -> dict:
+    user = {
+        "email": f"bulk{i}@example.com",
+        "mobile": "09123456789",
+        "firstName": "Bulk",
+        "lastName": f"User{i}",
+        "username": f"bulkuser{i}",
+        "plain_password": "testpass",
+        "role": "User"
+    }
+    return {**user, **overrides}
+
+@pytest.mark.asyncio
+async def test_register_users_bulk_inserts_batches_and_reports_duplicates(client, create_user_token, monkeypatch):
+    from ..auth.auth import verify_password
+    monkeypatch.setattr("user.config.BULK_REGISTER_BATCH_SIZE", 2)
+
+    users = [
+        bulk_user(0),
+        bulk_user(1, username="testuser"),
+        bulk_user(2),
+        bulk_user(3, email="bulk0@example.com"),
+        bulk_user(4),
+    ]
+    response = await client.post("/users/register/bulk", headers={"Authorization": create_user_token}, json=users)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "created": 3,
+        "errors": [
+            {"index": 1, "username": "testuser", "detail": "Username already exists"},
+            {"index": 3, "username": "bulkuser3", "detail": "Email already exists"},
+        ]
+    }
+    db = TestingSessionLocal()
+    try:
+        credentials = db.query(Credential).join(User).filter(User.email.like("bulk%")).order_by(Credential.username).all()
+        assert [c.username for c in credentials] == ["bulkuser0", "bulkuser2", "bulkuser4"]
+        assert verify_password("testpass", credentials[0].hashed_password)
+    finally:
+        db.close()
+
+@pytest.mark.asyncio
+async def test_register_users_bulk_rejects_oversized_requests(client, create_user_token, monkeypatch):
+    monkeypatch.setattr("user.config.BULK_REGISTER_MAX_USERS", 1)
+    response = await client.post("/users/register/bulk", headers={"Authorization": create_user_token}, json=[bulk_user(0), bulk_user(1)])
+    assert response.status_code == 413
+
+def test_import_users_parses_csv_and_jsonl(tmp_path):
+    import json
+    from ..import_users import parse_users
+
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(
+        "email,mobile,firstName,middleName,lastName,role,username,plain_password\n"
+        "a@example.com,09123456789,Ann,,Lee,User,ann,secret\n"
+        "not-an-email,09123456789,Bob,,Lee,User,bob,secret\n"
+    )
+    users, lines, errors = parse_users(csv_file)
+    assert [user.username for user in users] == ["ann"]
+    assert users[0].middleName is None
+    assert lines == [2]
+    assert len(errors) == 1 and errors[0].startswith("line 3: email")
+
+    jsonl_file = tmp_path / "users.jsonl"
+    jsonl_file.write_text("\n".join(json.dumps(bulk_user(i)) for i in range(3)) + "\n")
+    users, lines, errors = parse_users(jsonl_file)
+    assert [user.username for user in users] == ["bulkuser0", "bulkuser1", "bulkuser2"]
+    assert lines == [1, 2, 3] and errors == []
+
+@pytest.mark.asyncio
+async def test_get_users_batch_preserves_order_and_reports_missing(client, create_user_token):
+    token = create_user_token
+    response = await client.post("/users/batch", headers={"Authorization": token}, json={"ids": [3, 99, 1, 3]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [user["id"] for user in body["data"]] == [3, 1]
+    assert body["missing"] == [99]
+    single = (await client.get("/users/3", headers={"Authorization": token})).json()
+    assert body["data"][0] == single
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ids, expected_status", [([], 422), (list(range(1, 5)), 413)])
+async def test_get_users_batch_rejects_empty_and_oversized_requests(client, create_user_token, monkeypatch, ids, expected_status):
+    monkeypatch.setattr("user.config.USER_BATCH_MAX_IDS", 3)
+    response = await client.post("/users/batch", headers={"Authorization": create_user_token}, json={"ids": ids})
+    assert response.status_code == expected_status
+
+@pytest.mark.asyncio
+async def test_get_user_is_served_from_cache_until_updated(client, create_user_token):
+    from ..crud import user_cache
+    token = create_user_token
+
+    hits_before = user_cache.stats()["hits"]
+    first = await client.get("/users/2", headers={"Authorization": token})
+    second = await client.get("/users/2", headers={"Authorization": token})
+    assert first.content == second.content
+    assert user_cache.stats()["hits"] - hits_before == 1
+
+    response = await client.put("/users/update/2", headers={"Authorization": token}, json={"role": "Team Lead"})
+    assert response.status_code == 200
+    response = await client.get("/users/2", headers={"Authorization": token})
+    assert response.json()["role"] == "Team Lead"
+    assert response.json() == {**first.json(), "role": "Team Lead", "updated_at": response.json()["updated_at"]}
+
+def test_bytes_lru_cache_is_bounded_by_payload_size():
+    from ..cache import BytesLRUCache
+
+    cache = BytesLRUCache(max_bytes=10, ttl=60)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.set("c", b"cccc")
+    cache.set("huge", b"x" * 11)
+
+    assert cache.get("b") is None
+    assert cache.get("huge") is None
+    assert cache.get("c") == b"cccc"
+    stats = cache.stats()
+    assert stats["bytes"] == 8
+    assert stats["evictions"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+@pytest.mark.asyncio
+async def test_get_user_conditional_request_returns_304_until_modified(client, create_user_token):
+    from sqlalchemy import event
+    from ..crud import user_cache
+    from .test_db import engine
+    token = create_user_token
+    response = await client.get("/users/2", headers={"Authorization": token})
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    user_cache.clear()
+    statements = []
+    capture = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = await client.get("/users/2", headers={"Authorization": token, "If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    user_queries = [statement for statement in statements if "FROM users" in statement]
+    assert len(user_queries) == 1 and "users.email" not in user_queries[0]
+
+    await client.put("/users/update/2", headers={"Authorization": token}, json={"role": "Team Lead"})
+    response = await client.get("/users/2", headers={"Authorization": token, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["role"] == "Team Lead"
+
+@pytest.mark.asyncio
+async def test_get_all_users_conditional_request_returns_304_until_page_changes(client, create_user_token):
+    token = create_user_token
+    response = await client.get("/users", params={"limit": 2}, headers={"Authorization": token})
+    etag = response.headers["ETag"]
+
+    response = await client.get("/users", params={"limit": 2}, headers={"Authorization": token, "If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+
+    response = await client.get("/users", params={"limit": 3}, headers={"Authorization": token, "If-None-Match": etag})
+    assert response.status_code == 200
+
+    await client.put("/users/update/1", headers={"Authorization": token}, json={"role": "Team Lead"})
+    response = await client.get("/users", params={"limit": 2}, headers={"Authorization": token, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag